@@ -0,0 +1,211 @@
+import asyncio
+import itertools
+import random
+import time
+
+STAR_EMOJI = "⭐"
+
+
+class FakeDiscord:
+    """Simuliert die REST-Seite von Discord: Latenz mit Jitter und gelegentliche 429-Antworten.
+
+    Wie bei discord.py wartet ein 429 die `retry_after`-Zeit ab und wiederholt
+    den Aufruf; jeder Versuch zählt als REST-Aufruf. `star_counts` hält die
+    tatsächliche Anzahl Sterne pro Nachricht, die fetch_message zurückgibt.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.02, rate_limit_ratio=0.0, retry_after=1.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.star_counts = {}
+        self.calls = {}          # Route -> Anzahl Aufrufe
+        self.rate_limited = 0
+        self._ids = itertools.count(10 ** 15)
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def next_id(self):
+        return next(self._ids)
+
+    async def request(self, route):
+        while True:
+            self.calls[route] = self.calls.get(route, 0) + 1
+            await asyncio.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+            if self.random.random() >= self.rate_limit_ratio:
+                return
+            self.rate_limited += 1
+            await asyncio.sleep(self.retry_after)
+
+
+class FakeAuthor:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.mention = f"<@{user_id}>"
+
+
+class FakeReaction:
+    def __init__(self, emoji, count):
+        self.emoji = emoji
+        self.count = count
+
+
+class FakeMessage:
+    def __init__(self, message_id, channel, content="", author=None, stars=0):
+        self.id = message_id
+        self.channel = channel
+        self.content = content
+        self.author = author or FakeAuthor(message_id % 997)
+        self.reactions = [FakeReaction(STAR_EMOJI, stars)] if stars else []
+
+
+class FakeThread:
+    """Forum-Thread mit fetch_message über die simulierte REST-API."""
+
+    def __init__(self, discord, thread_id, parent_id):
+        self.discord = discord
+        self.id = thread_id
+        self.parent_id = parent_id
+        self.mention = f"<#{thread_id}>"
+
+    async def fetch_message(self, message_id):
+        await self.discord.request("fetch_message")
+        stars = self.discord.star_counts.get(message_id, 0)
+        return FakeMessage(message_id, self, content=f"Beitrag {message_id}", stars=stars)
+
+
+class FakePartialMessage:
+    def __init__(self, discord, message_id):
+        self.discord = discord
+        self.id = message_id
+
+    async def edit(self, **fields):
+        await self.discord.request("edit")
+        return self
+
+    async def delete(self):
+        await self.discord.request("delete")
+
+
+class FakeStarboardChannel:
+    def __init__(self, discord, channel_id):
+        self.discord = discord
+        self.id = channel_id
+        self.mention = f"<#{channel_id}>"
+
+    async def send(self, content=None, embed=None):
+        await self.discord.request("send")
+        return FakePartialMessage(self.discord, self.discord.next_id())
+
+    def get_partial_message(self, message_id):
+        return FakePartialMessage(self.discord, message_id)
+
+
+class FakeGuild:
+    """Channel- und Thread-Lookup einer Guild wie bei discord.Guild (Dict-Zugriff)."""
+
+    def __init__(self, guild_id, channels):
+        self.id = guild_id
+        self.shard_id = 0
+        self._channels = channels  # channel_id -> FakeThread/FakeStarboardChannel
+
+    def get_thread(self, thread_id):
+        channel = self._channels.get(thread_id)
+        return channel if isinstance(channel, FakeThread) else None
+
+    def get_channel_or_thread(self, channel_id):
+        return self._channels.get(channel_id)
+
+
+class _Transaction:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    """Beantwortet die Abfragen des Bots auf starboard_mapping aus einem Dictionary."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def transaction(self):
+        return _Transaction()
+
+    async def _query(self):
+        self.pool.queries += 1
+        await asyncio.sleep(self.pool.latency)
+
+    async def fetchrow(self, sql, *args):
+        await self._query()
+        if "FROM starboard_mapping WHERE guild_id = $1 AND message_id = $2" in sql:
+            row = self.pool.mappings.get(args[1])
+            if row is None or row["guild_id"] != args[0]:
+                return None
+            return row
+        raise NotImplementedError(f"Abfrage wird vom Datenbank-Ersatz nicht unterstützt: {sql.strip()}")
+
+    async def fetch(self, sql, *args):
+        await self._query()
+        if "FROM starboard_mapping WHERE guild_id = $1 AND message_id = ANY" in sql:
+            guild_id, message_ids = args
+            return [row for row in (self.pool.mappings.get(mid) for mid in message_ids)
+                    if row is not None and row["guild_id"] == guild_id]
+        if "FROM starboard_mapping ORDER BY updated_at" in sql:
+            return []
+        if "FROM guild_config" in sql:
+            return []
+        raise NotImplementedError(f"Abfrage wird vom Datenbank-Ersatz nicht unterstützt: {sql.strip()}")
+
+    async def execute(self, sql, *args):
+        await self._query()
+        if "INSERT INTO starboard_mapping" in sql:
+            for message_id, guild_id, starboard_message_id, stars, author_id in zip(*args):
+                self.pool.mappings[message_id] = {
+                    "message_id": message_id, "guild_id": guild_id,
+                    "starboard_message_id": starboard_message_id, "stars": stars, "author_id": author_id,
+                    "updated_at": time.time(),
+                }
+        elif "DELETE FROM starboard_mapping" in sql:
+            for message_id in args[0]:
+                self.pool.mappings.pop(message_id, None)
+        # Schema, guild_config, pg_notify, Advisory-Locks: nichts zu tun
+        return "OK"
+
+
+class _Acquire:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __await__(self):
+        return self.__aenter__().__await__()
+
+    async def __aenter__(self):
+        return FakeConnection(self.pool)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakePool:
+    """In-Process-Ersatz für den asyncpg-Pool mit fester Latenz pro Abfrage."""
+
+    def __init__(self, latency=0.002):
+        self.latency = latency
+        self.queries = 0
+        self.mappings = {}  # message_id -> Zeile
+
+    def acquire(self):
+        return _Acquire(self)
+
+    async def release(self, connection):
+        pass
+
+    async def close(self):
+        pass
@@ -0,0 +1,274 @@
+"""Offline-Benchmark für den Pfad on_raw_reaction_add -> update_starboard_message.
+
+Spielt synthetische Reaktions-Streams gegen die echten Handler aus main.py ab.
+Discord wird durch Fake-Objekte mit simulierter REST-Latenz und 429-Antworten
+ersetzt, die Datenbank durch einen In-Process-Ersatz oder (mit --dsn) eine
+lokale PostgreSQL-Instanz.
+
+Verwendung (aus dem Projektverzeichnis):
+    python -m benchmarks.run --scenario hot --events 5000
+    python -m benchmarks.run --scenario all --json > baseline.json
+    python -m benchmarks.run --scenario all --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+from benchmarks.fakes import FakeDiscord, FakeGuild, FakePool, FakeStarboardChannel, FakeThread, STAR_EMOJI
+from benchmarks.scenarios import MESSAGE_ID_BASE, SCENARIOS, generate
+
+GUILD_ID = 1
+FORUM_CHANNEL_ID = 10
+STARBOARD_CHANNEL_ID = 20
+THREAD_ID_BASE = 1000
+
+# Kennzahlen, bei denen ein höherer Wert eine Verschlechterung ist (für --baseline)
+HIGHER_IS_WORSE = ("p50_latency", "p99_latency", "rest_calls_per_event", "db_queries_per_event")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline-Benchmark der Starboard-Updates")
+    parser.add_argument("--scenario", default="uniform", choices=sorted(SCENARIOS) + ["all"])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=0, help="Events pro Sekunde (0 = so schnell wie möglich)")
+    parser.add_argument("--threshold", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rest-latency", type=float, default=0.05)
+    parser.add_argument("--rest-jitter", type=float, default=0.02)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.01, help="Anteil der REST-Aufrufe mit 429")
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--db-latency", type=float, default=0.002)
+    parser.add_argument("--dsn", help="Lokale PostgreSQL-Datenbank statt des In-Process-Ersatzes")
+    parser.add_argument("--quiet-window", type=float, help="Debounce-Fenster überschreiben")
+    parser.add_argument("--outbound-rate", type=float, help="Outbound-Aufrufe pro Sekunde überschreiben")
+    parser.add_argument("--drain-timeout", type=float, default=120)
+    parser.add_argument("--log-level", default="WARNING", help="Log-Level des Bots während des Laufs")
+    parser.add_argument("--json", action="store_true", help="Ergebnis als JSON ausgeben")
+    parser.add_argument("--baseline", help="JSON-Ergebnis eines früheren Laufs zum Vergleich")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Erlaubte Verschlechterung gegenüber --baseline")
+    return parser.parse_args(argv)
+
+
+async def connect_database(database, args):
+    if not args.dsn:
+        database.pool = FakePool(latency=args.db_latency)
+        return
+    # Wie im Bot: Schema-Bootstrap und vorbereitete Statements pro Verbindung
+    database.connect_args = {"dsn": args.dsn}
+    await database.connect()
+    async with database.acquire() as connection:
+        await connection.execute(
+            "DELETE FROM starboard_mapping WHERE message_id BETWEEN $1 AND $2",
+            MESSAGE_ID_BASE, MESSAGE_ID_BASE + args.messages
+        )
+
+
+async def run_scenario(args):
+    import main
+    from monitoring import LatencyHistogram, monitor
+
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    discord = FakeDiscord(latency=args.rest_latency, jitter=args.rest_jitter,
+                          rate_limit_ratio=args.rate_limit_ratio, retry_after=args.retry_after,
+                          seed=args.seed)
+    threads = [FakeThread(discord, THREAD_ID_BASE + index, FORUM_CHANNEL_ID) for index in range(args.threads)]
+    channels = {thread.id: thread for thread in threads}
+    channels[STARBOARD_CHANNEL_ID] = FakeStarboardChannel(discord, STARBOARD_CHANNEL_ID)
+
+    # Bot-Zustand wie nach on_ready herstellen, nur ohne Gateway
+    await connect_database(main.database, args)
+    main.bot.get_channel = channels.get
+    main.bot.get_guild = {GUILD_ID: FakeGuild(GUILD_ID, channels)}.get
+    await main.guild_configs.ensure_schema()
+    await main.guild_configs.update(GUILD_ID, forum_channel_id=FORUM_CHANNEL_ID,
+                                    starboard_channel_id=STARBOARD_CHANNEL_ID, star_threshold=args.threshold)
+    main.forum_threads.rebuild({FORUM_CHANNEL_ID}, threads)
+    main.mapping_writer.start()
+    if args.quiet_window is not None:
+        main.update_coalescer.quiet_window = args.quiet_window
+        main.update_coalescer.max_delay = max(main.update_coalescer.max_delay, args.quiet_window)
+    if args.outbound_rate is not None:
+        main.outbound.rate = args.outbound_rate
+        main.outbound.burst = max(1, int(args.outbound_rate))
+
+    # Ende-zu-Ende-Latenz: vom Einspeisen eines Events bis zum Abschluss des Updates, das es abdeckt
+    latency = LatencyHistogram()
+    outstanding = {}  # message_id -> [Einspeisezeitpunkte]
+    in_flight = 0
+    original_update = main.update_starboard_message
+
+    async def timed_update(guild_id, channel_id, message_id, message=None):
+        nonlocal in_flight
+        in_flight += 1
+        started = time.perf_counter()
+        try:
+            await original_update(guild_id, channel_id, message_id, message)
+        finally:
+            in_flight -= 1
+            finished = time.perf_counter()
+            covered = [ts for ts in outstanding.get(message_id, ()) if ts <= started]
+            for ts in covered:
+                latency.record(finished - ts)
+            remaining = [ts for ts in outstanding.get(message_id, ()) if ts > started]
+            if remaining:
+                outstanding[message_id] = remaining
+            else:
+                outstanding.pop(message_id, None)
+
+    main.update_starboard_message = timed_update
+
+    stream = generate(args.scenario, args.events, args.messages, seed=args.seed)
+    db_before = monitor.db_query_count
+    updates_before = monitor.starboard_updates
+    dropped_before = monitor.queue_dropped
+    coalesced_before = monitor.outbound_coalesced
+    interval = 1.0 / args.rate if args.rate > 0 else 0.0
+
+    start = time.perf_counter()
+    for index, (delta, message_id) in enumerate(stream):
+        thread = threads[(message_id - MESSAGE_ID_BASE) % len(threads)]
+        discord.star_counts[message_id] = max(0, discord.star_counts.get(message_id, 0) + delta)
+        payload = SimpleNamespace(guild_id=GUILD_ID, channel_id=thread.id, message_id=message_id,
+                                  user_id=index, emoji=STAR_EMOJI)
+        outstanding.setdefault(message_id, []).append(time.perf_counter())
+        if delta > 0:
+            await main.on_raw_reaction_add(payload)
+        else:
+            await main.on_raw_reaction_remove(payload)
+        if interval:
+            await asyncio.sleep(max(0.0, start + (index + 1) * interval - time.perf_counter()))
+        elif index % 100 == 0:
+            await asyncio.sleep(0)
+
+    # Warten, bis Debounce, Warteschlange, laufende Updates und ausstehende Discord-Aufrufe leer sind
+    # (mehrmals hintereinander, da zwischen Debounce und Warteschlange kurz beides leer ist).
+    # Danach noch offene Events wurden verworfen (lost_events).
+    deadline = time.perf_counter() + args.drain_timeout
+    idle_polls = 0
+    while time.perf_counter() < deadline and idle_polls < 3:
+        idle = (not main.update_coalescer.pending_count() and not main.starboard_dispatcher.queue_depth()
+                and not in_flight and not main.outbound.queue_depth() and not main.outbound.running_count())
+        idle_polls = idle_polls + 1 if idle else 0
+        await asyncio.sleep(0.05)
+    duration = time.perf_counter() - start
+
+    await main.starboard_dispatcher.stop()
+    await main.outbound.stop()
+    await main.mapping_writer.close()
+    await main.database.close()
+
+    events = len(stream)
+    return {
+        "scenario": args.scenario,
+        "events": events,
+        "duration": duration,
+        "events_per_second": events / duration if duration > 0 else 0.0,
+        "p50_latency": latency.percentile(50),
+        "p99_latency": latency.percentile(99),
+        "max_latency": latency.max,
+        "rest_calls_per_event": discord.total_calls / events if events else 0.0,
+        "rest_calls": dict(discord.calls),
+        "rate_limited": discord.rate_limited,
+        "db_queries_per_event": (monitor.db_query_count - db_before) / events if events else 0.0,
+        "starboard_updates": monitor.starboard_updates - updates_before,
+        "dropped": monitor.queue_dropped - dropped_before,
+        "outbound_coalesced": monitor.outbound_coalesced - coalesced_before,
+        "lost_events": sum(len(timestamps) for timestamps in outstanding.values()),
+    }
+
+
+def run_all(argv):
+    """Jedes Szenario läuft in einem eigenen Prozess, damit sich Caches und Zähler nicht beeinflussen."""
+    results = []
+    for name in sorted(SCENARIOS):
+        scenario_argv = [arg for arg in argv if arg not in ("--json",)]
+        scenario_argv = _replace_option(scenario_argv, "--scenario", name)
+        scenario_argv = _replace_option(scenario_argv, "--baseline", None)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", *scenario_argv, "--json"],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.extend(json.loads(output))
+    return results
+
+
+def _replace_option(argv, option, value):
+    result, skip = [], False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        if arg == option:
+            skip = True
+            continue
+        if arg.startswith(option + "="):
+            continue
+        result.append(arg)
+    if value is not None:
+        result += [option, value]
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Gibt die Liste der Verschlechterungen gegenüber dem Baseline-Lauf zurück."""
+    previous = {result["scenario"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(result["scenario"])
+        if old is None:
+            continue
+        if result["events_per_second"] < old["events_per_second"] * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: events_per_second "
+                               f"{old['events_per_second']:.1f} -> {result['events_per_second']:.1f}")
+        for key in HIGHER_IS_WORSE:
+            if old[key] > 0 and result[key] > old[key] * (1 + tolerance):
+                regressions.append(f"{result['scenario']}: {key} {old[key]:.4f} -> {result[key]:.4f}")
+    return regressions
+
+
+def print_report(results):
+    for result in results:
+        print(f"Szenario {result['scenario']}: {result['events']} Events in {result['duration']:.2f} s")
+        print(f"  Durchsatz:           {result['events_per_second']:.1f} Events/s")
+        print(f"  E2E-Latenz p50/p99:  {result['p50_latency']:.3f} / {result['p99_latency']:.3f} s "
+              f"(max. {result['max_latency']:.3f} s)")
+        print(f"  REST-Aufrufe/Event:  {result['rest_calls_per_event']:.3f} {result['rest_calls']} "
+              f"({result['rate_limited']}x 429)")
+        print(f"  DB-Abfragen/Event:   {result['db_queries_per_event']:.3f}")
+        print(f"  Zusammengefasste Discord-Aufrufe: {result.get('outbound_coalesced', 0)}")
+        print(f"  Starboard-Updates:   {result['starboard_updates']} "
+              f"(verworfen: {result['dropped']}, Events ohne Update: {result['lost_events']})")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    if args.scenario == "all":
+        results = run_all(argv)
+    else:
+        results = [asyncio.run(run_scenario(args))]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"Verschlechterung: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
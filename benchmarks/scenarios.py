@@ -0,0 +1,46 @@
+import random
+
+MESSAGE_ID_BASE = 10 ** 12
+
+
+def message_ids(messages):
+    return [MESSAGE_ID_BASE + index for index in range(messages)]
+
+
+def uniform(events, messages, rng):
+    """Sterne verteilen sich gleichmäßig über alle Nachrichten."""
+    ids = message_ids(messages)
+    return [(1, rng.choice(ids)) for _ in range(events)]
+
+
+def hot(events, messages, rng, hot_messages=5, hot_ratio=0.9):
+    """Reaktions-Stürme: der Großteil der Events trifft wenige Nachrichten."""
+    ids = message_ids(messages)
+    hot_ids = ids[:hot_messages]
+    return [(1, rng.choice(hot_ids) if rng.random() < hot_ratio else rng.choice(ids))
+            for _ in range(events)]
+
+
+def churn(events, messages, rng, remove_ratio=0.5):
+    """Sterne werden abwechselnd gesetzt und wieder entfernt (Zähler pendeln um den Schwellenwert)."""
+    ids = message_ids(messages)
+    counts = dict.fromkeys(ids, 0)
+    stream = []
+    for _ in range(events):
+        message_id = rng.choice(ids)
+        delta = -1 if counts[message_id] > 0 and rng.random() < remove_ratio else 1
+        counts[message_id] += delta
+        stream.append((delta, message_id))
+    return stream
+
+
+SCENARIOS = {
+    "uniform": uniform,
+    "hot": hot,
+    "churn": churn,
+}
+
+
+def generate(name, events, messages, seed=None):
+    """Liefert eine Liste von (delta, message_id)."""
+    return SCENARIOS[name](events, messages, random.Random(seed))
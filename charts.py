@@ -0,0 +1,141 @@
+import asyncio
+import inspect
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from monitoring import monitor
+
+
+# ------------------------
+# Render-Funktionen (laufen im Worker-Thread)
+# ------------------------
+# matplotlib wird erst beim ersten Rendern importiert und nur über die
+# objektorientierte Figure-API benutzt – kein globaler pyplot-Zustand.
+def _new_figure(figsize):
+    from matplotlib.figure import Figure
+    return Figure(figsize=figsize)
+
+
+def _to_png(fig):
+    buf = BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+
+def render_bot_chart(timestamps, updates):
+    start_time = timestamps[0]
+    rel_times = [t - start_time for t in timestamps]
+
+    fig = _new_figure((10, 5))
+    ax = fig.subplots()
+    ax.plot(rel_times, updates, marker="o", label="Starboard-Updates")
+    ax.set_xlabel("Zeit (s) seit Start")
+    ax.set_ylabel("Anzahl Updates")
+    ax.set_title("Verlauf der Starboard-Updates")
+    ax.grid(True)
+    return _to_png(fig)
+
+
+def render_system_chart(timestamps, cpu_vals, mem_vals, rss_vals=None):
+    start_time = timestamps[0]
+    rel_times = [t - start_time for t in timestamps]
+
+    fig = _new_figure((10, 6))
+    cpu_ax, mem_ax = fig.subplots(2, 1)
+
+    # CPU
+    cpu_ax.plot(rel_times, cpu_vals, marker="o", label="CPU-Auslastung (%)")
+    cpu_ax.set_title("Systemressourcen")
+    cpu_ax.set_ylabel("CPU %")
+    cpu_ax.grid(True)
+    cpu_ax.legend()
+
+    # RAM
+    mem_ax.plot(rel_times, mem_vals, marker="o", color="orange", label="RAM (MB)")
+    if rss_vals:
+        mem_ax.plot(rel_times, rss_vals, marker="o", color="green", label="RSS Bot (MB)")
+    mem_ax.set_xlabel("Zeit (s) seit Start")
+    mem_ax.set_ylabel("RAM (MB)")
+    mem_ax.grid(True)
+    mem_ax.legend()
+    return _to_png(fig)
+
+
+class ChartRenderer:
+    """Rendert Charts in einem eigenen Worker-Thread und cacht die PNGs pro Zeitfenster.
+
+    Innerhalb desselben Fensters (`cache_seconds`) wird ein Chart nur einmal
+    gerendert; gleichzeitige Anfragen teilen sich denselben Render-Vorgang.
+    Gehalten werden nur PNGs des aktuellen Fensters, höchstens `cache_size`
+    (LRU).
+    """
+
+    def __init__(self, cache_seconds=60, cache_size=16):
+        self.cache_seconds = cache_seconds
+        self.cache_size = max(1, cache_size)
+        self._executor = None
+        self._cache = OrderedDict()  # name -> (fenster, png)
+        self._inflight = {}  # name -> (fenster, Future)
+
+    def _window(self):
+        return int(time.time() // self.cache_seconds) if self.cache_seconds > 0 else time.time()
+
+    async def render(self, name, build_args, render_fn):
+        """Liefert das PNG für `name` oder None, wenn keine Daten vorliegen.
+
+        `build_args()` liefert die Argumente für `render_fn` (erstes Argument:
+        Zeitstempel) und darf auch eine Coroutine zurückgeben.
+        """
+        window = self._window()
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == window:
+            self._cache.move_to_end(name)
+            monitor.record_chart_cache_hit()
+            return cached[1]
+
+        inflight = self._inflight.get(name)
+        if inflight is not None and inflight[0] == window:
+            png, _ = await asyncio.shield(inflight[1])
+            return png
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart-render")
+
+        loop = asyncio.get_running_loop()
+        args = build_args()
+        if inspect.isawaitable(args):
+            args = await args
+        if not args[0]:
+            return None
+        future = loop.run_in_executor(self._executor, self._timed_render, render_fn, args)
+        self._inflight[name] = (window, future)
+        try:
+            png, duration = await asyncio.shield(future)
+        finally:
+            if self._inflight.get(name, (None, None))[1] is future:
+                del self._inflight[name]
+        monitor.record_chart_render(duration)
+        self._store(name, window, png)
+        return png
+
+    def _store(self, name, window, png):
+        # PNGs früherer Fenster werden nie wieder ausgeliefert
+        for stale in [key for key, (cached_window, _) in self._cache.items() if cached_window != window]:
+            del self._cache[stale]
+        self._cache[name] = (window, png)
+        self._cache.move_to_end(name)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _timed_render(render_fn, args):
+        start = time.perf_counter()
+        png = render_fn(*args)
+        return png, time.perf_counter() - start
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
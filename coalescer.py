@@ -0,0 +1,77 @@
+import asyncio
+import logging
+
+from monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingUpdate:
+    __slots__ = ("item", "first_seen", "handle")
+
+    def __init__(self, item, first_seen, handle):
+        self.item = item
+        self.first_seen = first_seen
+        self.handle = handle
+
+
+class UpdateCoalescer:
+    """Fasst Bursts von Events pro Schlüssel (z.B. message_id) zu einem Aufruf zusammen.
+
+    Jedes neue Event verschiebt den Flush um `quiet_window` Sekunden nach hinten,
+    spätestens `max_delay` Sekunden nach dem ersten Event des Bursts wird aber
+    in jedem Fall geflusht. Beim Flush wird nur das zuletzt übergebene Item
+    an den Callback weitergereicht – oder, falls `merge` gesetzt ist, das
+    Ergebnis von merge(altes_item, neues_item).
+    """
+
+    def __init__(self, callback, quiet_window=1.5, max_delay=10.0, merge=None):
+        self.callback = callback
+        self.merge = merge
+        self.quiet_window = max(0.0, quiet_window)
+        self.max_delay = max(self.quiet_window, max_delay)
+        self._pending = {}  # key -> _PendingUpdate
+        self._tasks = set()
+
+    def submit(self, key, item):
+        """Registriert ein Event. Ein bereits wartendes Event für den Schlüssel wird ersetzt."""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        pending = self._pending.get(key)
+        if pending is None:
+            first_seen = now
+        else:
+            pending.handle.cancel()
+            first_seen = pending.first_seen
+            if self.merge is not None:
+                item = self.merge(pending.item, item)
+            monitor.record_coalesced_event()
+        deadline = min(now + self.quiet_window, first_seen + self.max_delay)
+        handle = loop.call_at(deadline, self._fire, key)
+        self._pending[key] = _PendingUpdate(item, first_seen, handle)
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def _fire(self, key):
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        task = asyncio.create_task(self._run(key, pending.item))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key, item):
+        try:
+            await self.callback(key, item)
+        except Exception:
+            logger.exception(f"Fehler beim Verarbeiten des zusammengefassten Updates für {key}")
+
+    async def flush_all(self):
+        """Führt alle wartenden Updates sofort aus (z.B. beim Herunterfahren)."""
+        pending, self._pending = self._pending, {}
+        for key, entry in pending.items():
+            entry.handle.cancel()
+            await self._run(key, entry.item)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
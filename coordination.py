@@ -0,0 +1,141 @@
+import asyncio
+import contextlib
+import inspect
+import logging
+import time
+import uuid
+
+from monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+MAPPING_CHANNEL = "starboard_mapping_changed"
+GUILD_CONFIG_CHANNEL = "starboard_guild_config_changed"
+
+# NOTIFY-Payloads sind auf knapp 8000 Bytes begrenzt (Snowflakes: bis zu 20 Zeichen + Komma)
+MAX_IDS_PER_NOTIFY = 300
+
+
+class Coordinator:
+    """Abstimmung mehrerer Bot-Prozesse über PostgreSQL.
+
+    Advisory-Locks auf die message_id serialisieren Starboard-Updates
+    prozessübergreifend. Über LISTEN/NOTIFY erfahren die übrigen Prozesse
+    von geänderten Mappings und Guild-Einstellungen und verwerfen ihre
+    gecachten Werte. Eigene Benachrichtigungen werden anhand der
+    Prozesskennung im Payload ignoriert. Ist `enabled` False, sind alle
+    Methoden wirkungslos (Einzelprozess-Betrieb).
+    """
+
+    def __init__(self, get_pool, enabled=False, reconnect_delay=5.0):
+        self.get_pool = get_pool
+        self.enabled = enabled
+        self.reconnect_delay = reconnect_delay
+        self.origin = uuid.uuid4().hex[:12]
+        self.on_reconnect = None  # async () -> None, nach verlorener LISTEN-Verbindung
+        self._handlers = {}       # channel -> handler(list[str])
+        self._callbacks = set()
+        self._task = None
+
+    def on(self, channel, handler):
+        self._handlers[channel] = handler
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._listen(), name="coordination-listen")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    @contextlib.asynccontextmanager
+    async def message_lock(self, message_id):
+        """Hält für die Dauer des Blocks ein Advisory-Lock auf die Nachricht.
+
+        Liefert die Verbindung, auf der das Lock gehalten wird (None ohne
+        Koordination). Der Block sollte seine Datenbankzugriffe darüber
+        ausführen, statt eine zweite Verbindung aus dem Pool zu belegen.
+        """
+        if not self.enabled:
+            yield None
+            return
+        start = time.perf_counter()
+        async with self.get_pool().acquire() as connection:
+            await connection.execute("SELECT pg_advisory_lock($1)", message_id)
+            monitor.record_lock_wait(time.perf_counter() - start)
+            try:
+                yield connection
+            finally:
+                # Bricht das Unlock ab, gibt der Pool beim Zurücklegen alle Locks der Session frei
+                await connection.execute("SELECT pg_advisory_unlock($1)", message_id)
+
+    async def notify(self, connection, channel, values):
+        """Sendet die Werte an alle anderen Prozesse (auf der übergebenen Verbindung/Transaktion)."""
+        if not self.enabled:
+            return
+        values = [str(value) for value in values]
+        for index in range(0, len(values), MAX_IDS_PER_NOTIFY):
+            payload = f"{self.origin}:{','.join(values[index:index + MAX_IDS_PER_NOTIFY])}"
+            await connection.execute("SELECT pg_notify($1, $2)", channel, payload)
+
+    async def notify_mappings(self, connection, message_ids):
+        await self.notify(connection, MAPPING_CHANNEL, message_ids)
+
+    async def notify_guild_config(self, connection, guild_id):
+        await self.notify(connection, GUILD_CONFIG_CHANNEL, [guild_id])
+
+    def _dispatch(self, connection, pid, channel, payload):
+        origin, _, body = payload.partition(":")
+        if origin == self.origin:
+            return
+        handler = self._handlers.get(channel)
+        if handler is None:
+            return
+        values = [value for value in body.split(",") if value]
+        monitor.record_invalidation(len(values))
+        self._run_callback(handler(values))
+
+    def _run_callback(self, result):
+        if inspect.isawaitable(result):
+            task = asyncio.ensure_future(result)
+            self._callbacks.add(task)
+            task.add_done_callback(self._callback_done)
+
+    def _callback_done(self, task):
+        self._callbacks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Fehler beim Verarbeiten einer Invalidierung: {task.exception()}")
+
+    async def _listen(self):
+        connected_before = False
+        while True:
+            pool = self.get_pool()
+            if pool is None:
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            try:
+                connection = await pool.acquire()
+            except Exception as e:
+                logger.error(f"LISTEN-Verbindung konnte nicht aufgebaut werden: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            closed = asyncio.Event()
+            try:
+                connection.add_termination_listener(lambda _connection: closed.set())
+                for channel in self._handlers:
+                    await connection.add_listener(channel, self._dispatch)
+                logger.info(f"Lausche auf {len(self._handlers)} Invalidierungs-Channels (Prozess {self.origin}).")
+                # Während der Unterbrechung verpasste Benachrichtigungen -> Caches komplett verwerfen
+                if connected_before and self.on_reconnect is not None:
+                    self._run_callback(self.on_reconnect())
+                connected_before = True
+                await closed.wait()
+                logger.warning("LISTEN-Verbindung verloren, verbinde neu …")
+            except Exception as e:
+                logger.error(f"Fehler in der LISTEN-Verbindung: {e}")
+            finally:
+                with contextlib.suppress(Exception):
+                    await pool.release(connection)
+            await asyncio.sleep(self.reconnect_delay)
@@ -0,0 +1,166 @@
+import logging
+import time
+
+import asyncpg
+
+from monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+# Anlegen bzw. Nachziehen von starboard_mapping samt Indizes; idempotent
+MAPPING_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS starboard_mapping (
+        message_id BIGINT PRIMARY KEY,
+        guild_id BIGINT,
+        starboard_message_id BIGINT NOT NULL,
+        stars INTEGER NOT NULL DEFAULT 0,
+        author_id BIGINT,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    ALTER TABLE starboard_mapping ADD COLUMN IF NOT EXISTS guild_id BIGINT;
+    ALTER TABLE starboard_mapping ADD COLUMN IF NOT EXISTS author_id BIGINT;
+    ALTER TABLE starboard_mapping ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP;
+    CREATE INDEX IF NOT EXISTS starboard_mapping_guild_idx ON starboard_mapping (guild_id, message_id);
+    CREATE INDEX IF NOT EXISTS starboard_mapping_updated_idx ON starboard_mapping (updated_at DESC);
+"""
+
+# Altbestände ohne guild_id der Guild aus config.json zuordnen
+ASSIGN_LEGACY_GUILD_SQL = "UPDATE starboard_mapping SET guild_id = $1 WHERE guild_id IS NULL"
+
+# Lesezugriffe des Hot-Paths. asyncpg bereitet jedes Statement pro Verbindung einmal
+# vor und verwendet es aus dem Statement-Cache wieder; es wird nur der SQL-Text abgeglichen.
+STATEMENTS = {
+    "get_mapping":
+        "SELECT starboard_message_id FROM starboard_mapping WHERE guild_id = $1 AND message_id = $2",
+    "get_mapping_stars":
+        "SELECT message_id, stars FROM starboard_mapping WHERE guild_id = $1 AND message_id = ANY($2::bigint[])",
+    "recent_mappings":
+        "SELECT message_id, starboard_message_id FROM starboard_mapping ORDER BY updated_at DESC LIMIT $1",
+}
+
+
+class _AcquireContext:
+    """Wie asyncpg.Pool.acquire(): als `async with` oder mit await und späterem release()."""
+
+    __slots__ = ("database", "connection")
+
+    def __init__(self, database):
+        self.database = database
+        self.connection = None
+
+    async def _acquire(self):
+        database = self.database
+        database.waiting += 1
+        start = time.perf_counter()
+        try:
+            connection = await database.pool.acquire()
+        finally:
+            database.waiting -= 1
+        monitor.record_db_acquire(time.perf_counter() - start)
+        return connection
+
+    def __await__(self):
+        return self._acquire().__await__()
+
+    async def __aenter__(self):
+        self.connection = await self._acquire()
+        return self.connection
+
+    async def __aexit__(self, *exc):
+        connection, self.connection = self.connection, None
+        await self.database.pool.release(connection)
+        return False
+
+
+class Database:
+    """Verbindungs-Pool zur PostgreSQL-Datenbank mit Schema-Bootstrap.
+
+    Der Pool wird einmalig beim Start angelegt (`connect`), nachdem das
+    Schema von starboard_mapping über eine eigene Verbindung angelegt bzw.
+    migriert wurde. `fetch`/`fetchrow` führen die Statements aus STATEMENTS
+    über ihren Namen aus (vorbereitet über den Statement-Cache von asyncpg,
+    Größe `statement_cache_size` pro Verbindung), auf Wunsch auf einer
+    bereits belegten Verbindung (`connection`).
+
+    Die Datenbank ersetzt für die übrigen Komponenten den asyncpg-Pool
+    (`acquire`/`release`) und misst dabei die Wartezeit auf eine freie
+    Verbindung. `get_pool` liefert None, solange kein Pool besteht.
+    """
+
+    def __init__(self, connect_args, min_size=2, max_size=10, statement_cache_size=100):
+        self.connect_args = connect_args
+        self.min_size = min_size
+        self.max_size = max(1, max_size)
+        self.pool = None
+        self.statement_cache_size = statement_cache_size
+        self.waiting = 0  # Aufrufer, die gerade auf eine Verbindung warten
+
+    @property
+    def ready(self):
+        return self.pool is not None
+
+    def get_pool(self):
+        return self if self.pool is not None else None
+
+    async def connect(self):
+        if self.pool is not None:
+            return
+        connection = await asyncpg.connect(**self.connect_args)
+        try:
+            await self.bootstrap(connection)
+        finally:
+            await connection.close()
+        self.pool = await asyncpg.create_pool(
+            min_size=min(self.min_size, self.max_size),
+            max_size=self.max_size,
+            statement_cache_size=self.statement_cache_size,
+            **self.connect_args
+        )
+        logger.info(f"Datenbank-Pool angelegt ({self.min_size}-{self.max_size} Verbindungen).")
+
+    async def bootstrap(self, connection):
+        async with connection.transaction():
+            # Mehrere Prozesse: nur einer migriert gleichzeitig
+            await connection.execute("SELECT pg_advisory_xact_lock(hashtext('starboard_mapping'))")
+            await connection.execute(MAPPING_SCHEMA_SQL)
+
+    async def close(self):
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            await pool.close()
+
+    def acquire(self):
+        return _AcquireContext(self)
+
+    async def release(self, connection):
+        await self.pool.release(connection)
+
+    async def fetch(self, name, *args, connection=None):
+        if connection is not None:
+            return await connection.fetch(STATEMENTS[name], *args)
+        async with self.acquire() as connection:
+            return await connection.fetch(STATEMENTS[name], *args)
+
+    async def fetchrow(self, name, *args, connection=None):
+        if connection is not None:
+            return await connection.fetchrow(STATEMENTS[name], *args)
+        async with self.acquire() as connection:
+            return await connection.fetchrow(STATEMENTS[name], *args)
+
+    async def assign_legacy_guild(self, guild_id):
+        async with self.acquire() as connection:
+            return await connection.execute(ASSIGN_LEGACY_GUILD_SQL, guild_id)
+
+    def pool_stats(self):
+        """Auslastung des Pools: Verbindungen gesamt, belegt, wartende Aufrufer."""
+        if self.pool is None:
+            return {"size": 0, "in_use": 0, "max_size": self.max_size, "waiting": 0, "saturation": 0.0}
+        size = self.pool.get_size()
+        in_use = size - self.pool.get_idle_size()
+        return {
+            "size": size,
+            "in_use": in_use,
+            "max_size": self.max_size,
+            "waiting": self.waiting,
+            "saturation": in_use / self.max_size,
+        }
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_new", "block")
+
+
+class KeyedDispatcher:
+    """Arbeitswarteschlange mit Serialisierung pro Schlüssel.
+
+    Aufträge mit demselben Schlüssel (z.B. message_id) laufen nie parallel,
+    Aufträge mit verschiedenen Schlüsseln werden von einem begrenzten
+    Worker-Pool gleichzeitig abgearbeitet. Wartet für einen Schlüssel bereits
+    ein Auftrag, wird dessen Item ersetzt (es zählt nur der neueste Stand)
+    bzw. mit `merge(altes_item, neues_item)` zusammengeführt.
+
+    Ist die Warteschlange voll, entscheidet `overflow_policy`:
+    - "drop_oldest": ältesten wartenden Auftrag verwerfen
+    - "drop_new": neuen Auftrag verwerfen
+    - "block": Aufrufer wartet, bis wieder Platz ist (Backpressure)
+    """
+
+    def __init__(self, handler, workers=4, max_queue_size=1000, overflow_policy="drop_oldest", merge=None):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unbekannte Overflow-Policy: {overflow_policy}")
+        self.handler = handler
+        self.merge = merge
+        self.worker_count = max(1, workers)
+        self.max_queue_size = max(1, max_queue_size)
+        self.overflow_policy = overflow_policy
+
+        self._pending = OrderedDict()  # key -> (item, enqueued_at)
+        self._queued = set()           # Schlüssel, die in _ready stehen
+        self._active = set()           # Schlüssel, die gerade verarbeitet werden
+        self._ready = asyncio.Queue()
+        self._space = asyncio.Condition()
+        self._idle = asyncio.Event()   # gesetzt, solange nichts wartet oder läuft
+        self._idle.set()
+        self._workers = []
+
+    def start(self):
+        if self._workers:
+            return
+        for i in range(self.worker_count):
+            self._workers.append(asyncio.create_task(self._worker(), name=f"dispatcher-worker-{i}"))
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def drain(self, timeout=None):
+        """Wartet, bis alle eingereihten Aufträge abgearbeitet sind. Gibt False bei Zeitüberschreitung zurück."""
+        if not self._pending and not self._active:
+            return True
+        self.start()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def queue_depth(self):
+        return len(self._pending)
+
+    async def submit(self, key, item):
+        """Reiht einen Auftrag ein. Gibt False zurück, wenn er verworfen wurde."""
+        self.start()
+        if key in self._pending:
+            self._replace(key, item)
+            return True
+
+        if len(self._pending) >= self.max_queue_size:
+            if self.overflow_policy == "drop_new":
+                monitor.record_queue_dropped()
+                logger.warning(f"Warteschlange voll, Auftrag für {key} verworfen.")
+                return False
+            if self.overflow_policy == "drop_oldest":
+                dropped_key, _ = self._pending.popitem(last=False)
+                monitor.record_queue_dropped()
+                logger.warning(f"Warteschlange voll, ältester Auftrag für {dropped_key} verworfen.")
+            else:
+                async with self._space:
+                    await self._space.wait_for(lambda: len(self._pending) < self.max_queue_size)
+                if key in self._pending:
+                    self._replace(key, item)
+                    return True
+
+        self._pending[key] = (item, time.perf_counter())
+        self._idle.clear()
+        monitor.record_queue_depth(len(self._pending))
+        self._schedule(key)
+        return True
+
+    def _replace(self, key, item):
+        old_item, enqueued_at = self._pending[key]
+        if self.merge is not None:
+            item = self.merge(old_item, item)
+        self._pending[key] = (item, enqueued_at)
+
+    def _schedule(self, key):
+        if key in self._active or key in self._queued:
+            return
+        self._queued.add(key)
+        self._ready.put_nowait(key)
+
+    async def _notify_space(self):
+        async with self._space:
+            self._space.notify_all()
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            self._queued.discard(key)
+            if key in self._active or key not in self._pending:
+                continue
+            item, enqueued_at = self._pending.pop(key)
+            self._active.add(key)
+            monitor.record_queue_wait(time.perf_counter() - enqueued_at)
+            monitor.record_queue_depth(len(self._pending))
+            try:
+                if self.overflow_policy == "block":
+                    await self._notify_space()
+                await self.handler(key, item)
+            except Exception:
+                logger.exception(f"Fehler beim Verarbeiten des Auftrags für {key}")
+            finally:
+                self._active.discard(key)
+                if key in self._pending:
+                    self._schedule(key)
+                elif not self._pending and not self._active:
+                    self._idle.set()
@@ -0,0 +1,43 @@
+import hashlib
+from collections import OrderedDict
+
+
+def render_fingerprint(count, content, author_id):
+    """Kompakter Fingerprint des sichtbaren Inhalts eines Starboard-Posts."""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(f"{count}\x00{author_id}\x00".encode())
+    digest.update((content or "").encode())
+    return digest.digest()
+
+
+class RenderedPostCache:
+    """Merkt sich pro Starboard-Post den zuletzt gerenderten Stand (LRU-begrenzt).
+
+    Gespeichert werden der Stern-Zähler und der Fingerprint aus Zähler, Text
+    und Autor. Damit lassen sich Edits ohne sichtbare Änderung überspringen.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max(1, max_size)
+        self._entries = OrderedDict()  # starboard_message_id -> (count, fingerprint)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, starboard_message_id):
+        entry = self._entries.get(starboard_message_id)
+        if entry is not None:
+            self._entries.move_to_end(starboard_message_id)
+        return entry
+
+    def set(self, starboard_message_id, count, fingerprint):
+        self._entries[starboard_message_id] = (count, fingerprint)
+        self._entries.move_to_end(starboard_message_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def forget(self, starboard_message_id):
+        self._entries.pop(starboard_message_id, None)
+
+    def clear(self):
+        self._entries.clear()
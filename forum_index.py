@@ -0,0 +1,47 @@
+class ForumThreadIndex:
+    """Index der Thread-IDs, deren Parent einer der Ziel-Forum-Channels ist.
+
+    Wird aus den Thread- und Channel-Events aktuell gehalten, damit
+    Reaktions-Payloads allein anhand von `payload.channel_id` in O(1)
+    verworfen werden können, bevor ein REST-Aufruf anfällt.
+    """
+
+    def __init__(self, forum_channel_ids=()):
+        self.forum_channel_ids = set(forum_channel_ids)
+        self._threads = {}  # thread_id -> parent_id
+
+    def __len__(self):
+        return len(self._threads)
+
+    def __contains__(self, channel_id):
+        return channel_id in self._threads
+
+    def rebuild(self, forum_channel_ids, threads=()):
+        """Setzt die Ziel-Foren neu und füllt den Index mit den bekannten Threads."""
+        self.forum_channel_ids = set(forum_channel_ids)
+        self._threads = {thread.id: thread.parent_id for thread in threads
+                         if thread.parent_id in self.forum_channel_ids}
+
+    def add_forum(self, forum_channel_id, threads=()):
+        self.forum_channel_ids.add(forum_channel_id)
+        for thread in threads:
+            self.update_thread(thread)
+
+    def remove_forum(self, forum_channel_id):
+        self.forum_channel_ids.discard(forum_channel_id)
+        self._threads = {thread_id: parent_id for thread_id, parent_id in self._threads.items()
+                         if parent_id != forum_channel_id}
+
+    def update_thread(self, thread):
+        """Nimmt einen Thread auf oder entfernt ihn – je nachdem, ob er zu einem Ziel-Forum gehört."""
+        if thread.parent_id in self.forum_channel_ids:
+            self._threads[thread.id] = thread.parent_id
+            return True
+        self._threads.pop(thread.id, None)
+        return False
+
+    def discard(self, thread_id):
+        self._threads.pop(thread_id, None)
+
+    def clear(self):
+        self._threads.clear()
@@ -0,0 +1,120 @@
+import logging
+import time
+
+from monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS guild_config (
+        guild_id BIGINT PRIMARY KEY,
+        forum_channel_id BIGINT,
+        starboard_channel_id BIGINT,
+        star_threshold INTEGER NOT NULL DEFAULT 3,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+UPSERT_SQL = """
+    INSERT INTO guild_config (guild_id, forum_channel_id, starboard_channel_id, star_threshold)
+    VALUES ($1, $2, $3, $4)
+    ON CONFLICT (guild_id) DO UPDATE
+    SET forum_channel_id = EXCLUDED.forum_channel_id,
+        starboard_channel_id = EXCLUDED.starboard_channel_id,
+        star_threshold = EXCLUDED.star_threshold,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+FIELDS = ("forum_channel_id", "starboard_channel_id", "star_threshold")
+
+
+class GuildSettings:
+    __slots__ = ("guild_id",) + FIELDS
+
+    def __init__(self, guild_id, forum_channel_id=None, starboard_channel_id=None, star_threshold=3):
+        self.guild_id = guild_id
+        self.forum_channel_id = forum_channel_id
+        self.starboard_channel_id = starboard_channel_id
+        self.star_threshold = star_threshold
+
+    def replace(self, **changes):
+        values = {field: getattr(self, field) for field in FIELDS}
+        values.update(changes)
+        return GuildSettings(self.guild_id, **values)
+
+
+class GuildConfigStore:
+    """Einstellungen pro Guild aus der Tabelle guild_config, im Speicher gecacht.
+
+    Gelesen wird ausschließlich aus dem Cache (synchron, O(1)). Änderungen
+    werden in die Datenbank geschrieben und ersetzen danach den Cache-Eintrag.
+    Guilds ohne Eintrag erhalten die Standardwerte.
+    """
+
+    def __init__(self, get_pool, default_threshold=3, notify=None):
+        self.get_pool = get_pool
+        self.default_threshold = default_threshold
+        self.notify = notify  # async (connection, guild_id), z.B. NOTIFY an andere Prozesse
+        self._settings = {}  # guild_id -> GuildSettings
+
+    def __len__(self):
+        return len(self._settings)
+
+    def __contains__(self, guild_id):
+        return guild_id in self._settings
+
+    def all(self):
+        return list(self._settings.values())
+
+    def get(self, guild_id):
+        settings = self._settings.get(guild_id)
+        if settings is None:
+            return GuildSettings(guild_id, star_threshold=self.default_threshold)
+        return settings
+
+    def forum_channel_ids(self):
+        return {settings.forum_channel_id for settings in self._settings.values()
+                if settings.forum_channel_id is not None}
+
+    async def ensure_schema(self):
+        async with self.get_pool().acquire() as connection:
+            await connection.execute(SCHEMA_SQL)
+
+    async def load_all(self):
+        start = time.perf_counter()
+        async with self.get_pool().acquire() as connection:
+            rows = await connection.fetch(
+                "SELECT guild_id, forum_channel_id, starboard_channel_id, star_threshold FROM guild_config")
+        monitor.record_db_query(time.perf_counter() - start)
+        self._settings = {row["guild_id"]: GuildSettings(**dict(row)) for row in rows}
+        logger.info(f"Einstellungen für {len(self._settings)} Guilds geladen.")
+
+    async def reload(self, guild_id):
+        """Liest den Eintrag einer Guild neu aus der Datenbank (Cache-Invalidierung)."""
+        start = time.perf_counter()
+        async with self.get_pool().acquire() as connection:
+            row = await connection.fetchrow(
+                "SELECT guild_id, forum_channel_id, starboard_channel_id, star_threshold "
+                "FROM guild_config WHERE guild_id = $1", guild_id)
+        monitor.record_db_query(time.perf_counter() - start)
+        if row is None:
+            self._settings.pop(guild_id, None)
+        else:
+            self._settings[guild_id] = GuildSettings(**dict(row))
+        return self.get(guild_id)
+
+    async def update(self, guild_id, **changes):
+        """Ändert einzelne Felder einer Guild und schreibt sie in die Datenbank."""
+        unknown = set(changes) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unbekannte Einstellungen: {', '.join(sorted(unknown))}")
+        settings = self.get(guild_id).replace(**changes)
+        start = time.perf_counter()
+        async with self.get_pool().acquire() as connection:
+            await connection.execute(UPSERT_SQL, guild_id, settings.forum_channel_id,
+                                     settings.starboard_channel_id, settings.star_threshold)
+            if self.notify is not None:
+                await self.notify(connection, guild_id)
+        monitor.record_db_query(time.perf_counter() - start)
+        self._settings[guild_id] = settings
+        return settings
@@ -0,0 +1,145 @@
+"""Startet mehrere Bot-Prozesse, die sich die Gateway-Shards teilen.
+
+Verwendung: python launcher.py [Anzahl Prozesse]
+
+Jeder Prozess erhält über Umgebungsvariablen seinen Shard-Bereich und
+führt main.py aus. Abgestürzte Prozesse werden mit wachsender Wartezeit
+neu gestartet; SIGINT/SIGTERM beendet alle Prozesse.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import time
+
+import aiohttp
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s:%(levelname)s:%(name)s: %(message)s"
+)
+logger = logging.getLogger("launcher")
+
+CONFIG_FILE = "config.json"
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+# Läuft ein Prozess länger als das, gilt er als stabil und die Wartezeit wird zurückgesetzt
+STABLE_SECONDS = 60
+MAX_RESTART_DELAY = 300
+
+
+def load_config():
+    with open(CONFIG_FILE, "r") as f:
+        return json.load(f)
+
+
+def shard_ranges(shard_count, processes):
+    """Verteilt die Shards 0..shard_count-1 in zusammenhängenden Bereichen auf die Prozesse."""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for index in range(processes):
+        size = base + (1 if index < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+async def fetch_recommended_shards(token):
+    """Fragt die von Discord empfohlene Shard-Anzahl ab."""
+    headers = {"Authorization": f"Bot {token}"}
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_BOT_URL, headers=headers) as response:
+            response.raise_for_status()
+            data = await response.json()
+    return data["shards"]
+
+
+class ShardWorker:
+    """Ein Bot-Prozess mit festem Shard-Bereich, der bei einem Absturz neu gestartet wird."""
+
+    def __init__(self, index, shard_ids, shard_count, start_delay=0.0, restart_delay=5.0):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.start_delay = start_delay
+        self.restart_delay = restart_delay
+        self.process = None
+        self.stopping = asyncio.Event()
+
+    def environment(self):
+        env = dict(os.environ)
+        env["STARBOARD_SHARD_IDS"] = ",".join(str(shard_id) for shard_id in self.shard_ids)
+        env["STARBOARD_SHARD_COUNT"] = str(self.shard_count)
+        env["STARBOARD_PROCESS_INDEX"] = str(self.index)
+        return env
+
+    async def sleep(self, seconds):
+        """Wartet, bricht aber sofort ab, wenn der Launcher beendet wird."""
+        try:
+            await asyncio.wait_for(self.stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self):
+        # Gestaffelter Start, damit nicht alle Prozesse gleichzeitig IDENTIFY senden
+        await self.sleep(self.start_delay)
+        delay = self.restart_delay
+        while not self.stopping.is_set():
+            started = time.monotonic()
+            logger.info(f"Starte Prozess {self.index} mit Shards {self.shard_ids}.")
+            self.process = await asyncio.create_subprocess_exec(
+                sys.executable, MAIN_SCRIPT, env=self.environment()
+            )
+            returncode = await self.process.wait()
+            if self.stopping.is_set():
+                break
+            if time.monotonic() - started >= STABLE_SECONDS:
+                delay = self.restart_delay
+            logger.warning(f"Prozess {self.index} wurde mit Code {returncode} beendet, Neustart in {delay:.0f} Sekunden.")
+            await self.sleep(delay)
+            delay = min(delay * 2, MAX_RESTART_DELAY)
+
+    def stop(self):
+        self.stopping.set()
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+
+
+async def main():
+    config = load_config()
+    sharding = config.get("sharding", {})
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else sharding.get("processes", 1)
+
+    shard_count = sharding.get("shard_count") or await fetch_recommended_shards(config["token"])
+    ranges = shard_ranges(shard_count, processes)
+    logger.info(f"{shard_count} Shards auf {len(ranges)} Prozesse verteilt.")
+
+    start_delay = sharding.get("start_delay", 5)
+    workers = [
+        ShardWorker(index, shard_ids, shard_count,
+                    start_delay=index * start_delay,
+                    restart_delay=sharding.get("restart_delay", 5))
+        for index, shard_ids in enumerate(ranges)
+    ]
+
+    def shutdown():
+        logger.info("Beende alle Prozesse …")
+        for worker in workers:
+            worker.stop()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, shutdown)
+        except NotImplementedError:
+            pass  # Windows: Beenden per Strg+C über KeyboardInterrupt
+
+    await asyncio.gather(*(worker.run() for worker in workers))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
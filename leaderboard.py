@@ -0,0 +1,160 @@
+import time
+from collections import OrderedDict
+
+from monitoring import monitor
+
+DISCORD_EPOCH_MS = 1420070400000
+
+# Aggregat pro Autor, per Trigger bei jedem Schreibzugriff auf starboard_mapping nachgeführt
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS starboard_author_stats (
+        guild_id BIGINT NOT NULL,
+        author_id BIGINT NOT NULL,
+        posts INTEGER NOT NULL DEFAULT 0,
+        stars BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, author_id)
+    );
+    CREATE INDEX IF NOT EXISTS starboard_author_stats_rank_idx
+        ON starboard_author_stats (guild_id, stars DESC, author_id);
+    CREATE INDEX IF NOT EXISTS starboard_mapping_top_idx
+        ON starboard_mapping (guild_id, stars DESC, message_id DESC);
+
+    CREATE OR REPLACE FUNCTION starboard_author_stats_apply() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.guild_id IS NOT NULL AND OLD.author_id IS NOT NULL THEN
+            UPDATE starboard_author_stats
+            SET posts = posts - 1, stars = stars - OLD.stars
+            WHERE guild_id = OLD.guild_id AND author_id = OLD.author_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.guild_id IS NOT NULL AND NEW.author_id IS NOT NULL THEN
+            INSERT INTO starboard_author_stats (guild_id, author_id, posts, stars)
+            VALUES (NEW.guild_id, NEW.author_id, 1, NEW.stars)
+            ON CONFLICT (guild_id, author_id) DO UPDATE
+            SET posts = starboard_author_stats.posts + 1,
+                stars = starboard_author_stats.stars + EXCLUDED.stars;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- DROP + CREATE statt CREATE OR REPLACE TRIGGER (erst ab PostgreSQL 14)
+    DROP TRIGGER IF EXISTS starboard_author_stats_trigger ON starboard_mapping;
+    CREATE TRIGGER starboard_author_stats_trigger
+        AFTER INSERT OR UPDATE OR DELETE ON starboard_mapping
+        FOR EACH ROW EXECUTE FUNCTION starboard_author_stats_apply();
+"""
+
+# Einmalig beim Anlegen: Aggregat aus den bestehenden Mappings aufbauen
+BACKFILL_SQL = """
+    INSERT INTO starboard_author_stats (guild_id, author_id, posts, stars)
+    SELECT guild_id, author_id, count(*), sum(stars)
+    FROM starboard_mapping
+    WHERE guild_id IS NOT NULL AND author_id IS NOT NULL
+    GROUP BY guild_id, author_id
+"""
+
+# Zeitraum über die message_id (Snowflake = Erstellungszeitpunkt): nutzt den Index (guild_id, stars DESC, ...)
+TOP_POSTS_SQL = """
+    SELECT message_id, starboard_message_id, author_id, stars
+    FROM starboard_mapping
+    WHERE guild_id = $1 AND message_id >= $2
+    ORDER BY stars DESC, message_id DESC
+    LIMIT $3 OFFSET $4
+"""
+
+TOP_AUTHORS_SQL = """
+    SELECT author_id, posts, stars
+    FROM starboard_author_stats
+    WHERE guild_id = $1 AND posts > 0
+    ORDER BY stars DESC, author_id
+    LIMIT $2 OFFSET $3
+"""
+
+# Für Zeiträume: Range-Scan über den Index (guild_id, message_id), begrenzt auf den Zeitraum
+TOP_AUTHORS_PERIOD_SQL = """
+    SELECT author_id, count(*) AS posts, sum(stars) AS stars
+    FROM starboard_mapping
+    WHERE guild_id = $1 AND message_id >= $2 AND author_id IS NOT NULL
+    GROUP BY author_id
+    ORDER BY stars DESC, author_id
+    LIMIT $3 OFFSET $4
+"""
+
+
+def snowflake_for(timestamp):
+    """Kleinste Discord-ID, die zu einem Zeitpunkt (Unix-Sekunden) erzeugt worden sein kann."""
+    return max(0, int(timestamp * 1000) - DISCORD_EPOCH_MS) << 22
+
+
+class LeaderboardStore:
+    """Bestenlisten aus starboard_mapping und dem Aggregat starboard_author_stats.
+
+    Alle Abfragen sind auf eine Guild beschränkt, laufen über Indizes und
+    haben ein eigenes statement_timeout. Ergebnisse werden pro
+    (Guild, Liste, Zeitraum, Seite) für `cache_seconds` im Speicher gehalten;
+    geblättert wird höchstens bis Seite `max_pages`.
+    """
+
+    def __init__(self, get_pool, page_size=10, max_pages=10, cache_seconds=60,
+                 cache_size=256, statement_timeout_ms=2000):
+        self.get_pool = get_pool
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.cache_seconds = cache_seconds
+        self.cache_size = max(1, cache_size)
+        self.statement_timeout_ms = statement_timeout_ms
+        self._cache = OrderedDict()  # key -> (expires_at, rows, has_more)
+
+    async def ensure_schema(self):
+        async with self.get_pool().acquire() as connection:
+            async with connection.transaction():
+                # Mehrere Prozesse: nur einer legt an und befüllt das Aggregat
+                await connection.execute("SELECT pg_advisory_xact_lock(hashtext('starboard_author_stats'))")
+                exists = await connection.fetchval("SELECT to_regclass('starboard_author_stats') IS NOT NULL")
+                await connection.execute(SCHEMA_SQL)
+                if not exists:
+                    await connection.execute(BACKFILL_SQL)
+
+    def clamp_page(self, page):
+        return min(max(1, page), self.max_pages)
+
+    async def top_posts(self, guild_id, period=None, page=1):
+        """Beiträge mit den meisten Sternen. Gibt (Zeilen, weitere_Seiten) zurück."""
+        page = self.clamp_page(page)
+        min_message_id = snowflake_for(time.time() - period) if period else 0
+        return await self._cached(("posts", guild_id, period, page), TOP_POSTS_SQL,
+                                  guild_id, min_message_id, self.page_size + 1, (page - 1) * self.page_size)
+
+    async def top_authors(self, guild_id, period=None, page=1):
+        """Autoren mit den meisten Sternen. Gibt (Zeilen, weitere_Seiten) zurück."""
+        page = self.clamp_page(page)
+        offset = (page - 1) * self.page_size
+        if not period:
+            return await self._cached(("authors", guild_id, None, page), TOP_AUTHORS_SQL,
+                                      guild_id, self.page_size + 1, offset)
+        min_message_id = snowflake_for(time.time() - period)
+        return await self._cached(("authors", guild_id, period, page), TOP_AUTHORS_PERIOD_SQL,
+                                  guild_id, min_message_id, self.page_size + 1, offset)
+
+    async def _cached(self, key, sql, *args):
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > now:
+            self._cache.move_to_end(key)
+            return entry[1], entry[2]
+
+        start = time.perf_counter()
+        async with self.get_pool().acquire() as connection:
+            async with connection.transaction():
+                await connection.execute(f"SET LOCAL statement_timeout = {int(self.statement_timeout_ms)}")
+                rows = await connection.fetch(sql, *args)
+        monitor.record_db_query(time.perf_counter() - start)
+
+        # Eine Zeile mehr als nötig geladen, um zu erkennen, ob es eine weitere Seite gibt
+        has_more = len(rows) > self.page_size
+        rows = [dict(row) for row in rows[:self.page_size]]
+        self._cache[key] = (now + self.cache_seconds, rows, has_more)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return rows, has_more
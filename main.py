@@ -1,18 +1,38 @@
 import discord
 from discord.ext import commands
+import aiohttp
 import asyncpg
 import logging
 import json
 import os
 import asyncio
+import functools
 import time
 
-# Für die Charts
-import matplotlib.pyplot as plt
+# Für die Charts (matplotlib wird erst beim ersten Rendern importiert)
 from io import BytesIO
+from charts import ChartRenderer, render_bot_chart, render_system_chart
 
 # Monitoring-Modul importieren
 from monitoring import monitor
+from coalescer import UpdateCoalescer
+from dispatcher import KeyedDispatcher
+from mapping_cache import MappingCache, MISS
+from write_behind import MappingWriteBuffer, NOT_PENDING
+from star_tracker import StarCountTracker
+from fingerprints import RenderedPostCache, render_fingerprint
+from forum_index import ForumThreadIndex
+from guild_config import GuildConfigStore
+from coordination import Coordinator, MAPPING_CHANNEL, GUILD_CONFIG_CHANNEL
+from tracing import Tracer, format_trace
+from leaderboard import LeaderboardStore
+from db import Database
+from retry_queue import RetryQueue
+from message_cache import RecentMessageCache
+from metrics_exporter import MetricsExporter
+from metrics_store import MetricsStore
+from resync import ResyncCheckpointStore, ResyncJob
+from outbound import OutboundScheduler, PRIORITY_DELETE, PRIORITY_SEND, PRIORITY_EDIT
 
 # ------------------------
 # Logging-Konfiguration
@@ -35,239 +55,942 @@ def load_config():
     with open(CONFIG_FILE, "r") as f:
         return json.load(f)
 
-def save_config(config):
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=4)
-    logger.info("Konfiguration gespeichert.")
-
 config = load_config()
 
 TOKEN = config.get("token")
 PREFIX = config.get("prefix", "!")
-FORUM_CHANNEL_ID = config.get("forum_channel_id")
-STARBOARD_CHANNEL_ID = config.get("starboard_channel_id")
-STAR_THRESHOLD = config.get("star_threshold", 3)
+# Nur noch als Startwerte für die erste Guild und als Standard-Schwellenwert;
+# die Einstellungen pro Guild liegen in der Tabelle guild_config
+LEGACY_FORUM_CHANNEL_ID = config.get("forum_channel_id")
+LEGACY_STARBOARD_CHANNEL_ID = config.get("starboard_channel_id")
+DEFAULT_STAR_THRESHOLD = config.get("star_threshold", 3)
 DB_CONFIG = config.get("db", {})
+COALESCE_CONFIG = config.get("coalesce", {})
+DISPATCHER_CONFIG = config.get("dispatcher", {})
+MAPPING_CACHE_CONFIG = config.get("mapping_cache", {})
+WRITE_BEHIND_CONFIG = config.get("write_behind", {})
+STAR_TRACKER_CONFIG = config.get("star_tracker", {})
+CHARTS_CONFIG = config.get("charts", {})
+METRICS_EXPORTER_CONFIG = config.get("metrics_exporter", {})
+METRICS_STORE_CONFIG = config.get("metrics_store", {})
+OUTBOUND_CONFIG = config.get("outbound", {})
+RESYNC_CONFIG = config.get("resync", {})
+SHARDING_CONFIG = config.get("sharding", {})
+TRACING_CONFIG = config.get("tracing", {})
+LEADERBOARD_CONFIG = config.get("leaderboard", {})
+RETRY_CONFIG = config.get("retry", {})
+MEMORY_CONFIG = config.get("memory", {})
+LEAN_MODE = MEMORY_CONFIG.get("lean", False)
+
+# Shard-Bereich dieses Prozesses (vom Launcher über Umgebungsvariablen gesetzt)
+def parse_shard_ids(value):
+    return [int(shard_id) for shard_id in value.split(",") if shard_id.strip()] if value else None
+
+SHARD_IDS = parse_shard_ids(os.environ.get("STARBOARD_SHARD_IDS")) or SHARDING_CONFIG.get("shard_ids")
+SHARD_COUNT = int(os.environ.get("STARBOARD_SHARD_COUNT", 0)) or SHARDING_CONFIG.get("shard_count") or None
+PROCESS_INDEX = int(os.environ.get("STARBOARD_PROCESS_INDEX", 0))
+SHARDED = SHARDING_CONFIG.get("enabled", False) or SHARD_IDS is not None
 
 STAR_EMOJI = "⭐"
 
 # ------------------------
-# Datenbank-Pool (asyncpg) global
+# Tracing der einzelnen Stufen eines Starboard-Updates
+# ------------------------
+tracer = Tracer(
+    enabled=TRACING_CONFIG.get("enabled", True),
+    sample_rate=TRACING_CONFIG.get("sample_rate", 0.1),
+    capacity=TRACING_CONFIG.get("capacity", 100),
+    min_duration=TRACING_CONFIG.get("min_duration", 0.0)
+)
+
+# ------------------------
+# Datenbank: Pool wird einmalig in setup_hook angelegt
+# ------------------------
+database = Database(
+    {key: DB_CONFIG[key] for key in ("user", "password", "database", "host", "port") if key in DB_CONFIG},
+    min_size=DB_CONFIG.get("min_size", 2),
+    max_size=DB_CONFIG.get("max_size", 10),
+    statement_cache_size=DB_CONFIG.get("statement_cache_size", 100)
+)
+
+# ------------------------
+# Abstimmung mehrerer Prozesse (Advisory-Locks, LISTEN/NOTIFY)
+# ------------------------
+coordinator = Coordinator(
+    database.get_pool,
+    enabled=SHARDED and SHARDING_CONFIG.get("coordination", True)
+)
+
+# ------------------------
+# Einstellungen pro Guild (aus guild_config, im Speicher gecacht)
+# ------------------------
+guild_configs = GuildConfigStore(
+    database.get_pool,
+    default_threshold=DEFAULT_STAR_THRESHOLD,
+    notify=coordinator.notify_guild_config
+)
+
+# ------------------------
+# Read-Through-Cache vor der starboard_mapping-Tabelle
 # ------------------------
-db_pool = None
+mapping_cache = MappingCache(
+    max_size=MAPPING_CACHE_CONFIG.get("max_size", 10000),
+    ttl=MAPPING_CACHE_CONFIG.get("ttl", 3600),
+    negative_ttl=MAPPING_CACHE_CONFIG.get("negative_ttl", 300)
+)
+
+# ------------------------
+# Write-Behind-Puffer für Schreibzugriffe auf starboard_mapping
+# ------------------------
+mapping_writer = MappingWriteBuffer(
+    database.get_pool,
+    flush_interval=WRITE_BEHIND_CONFIG.get("flush_interval", 5.0),
+    max_pending=WRITE_BEHIND_CONFIG.get("max_pending", 500),
+    notify=coordinator.notify_mappings
+)
+
+# ------------------------
+# Persistenz der Monitoring-Daten (Rohdaten + 1-Minuten-/1-Stunden-Rollups)
+# ------------------------
+metrics_store = None
+if METRICS_STORE_CONFIG.get("enabled", False):
+    metrics_store = MetricsStore(
+        database.get_pool,
+        flush_interval=METRICS_STORE_CONFIG.get("flush_interval", 60),
+        raw_retention_days=METRICS_STORE_CONFIG.get("raw_retention_days", 2),
+        minute_retention_days=METRICS_STORE_CONFIG.get("minute_retention_days", 30),
+        hour_retention_days=METRICS_STORE_CONFIG.get("hour_retention_days", 365)
+    )
+    monitor.add_sink(metrics_store.add)
 
 # ------------------------
 # Bot-Initialisierung
 # ------------------------
-intents = discord.Intents.default()
-intents.message_content = True
-intents.reactions = True
-intents.messages = True
-intents.guilds = True
+if LEAN_MODE:
+    # Nur was der Bot braucht: Channels/Threads, Reaktionen in Guilds und Nachrichten für Commands
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_reactions = True
+    intents.guild_messages = True
+    intents.message_content = True
+else:
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.reactions = True
+    intents.messages = True
+    intents.guilds = True
 
-bot = commands.Bot(command_prefix=PREFIX, intents=intents)
+client_options = {}
+if LEAN_MODE:
+    # Reaktionen kommen als Raw-Events an; discord.py muss dafür weder Nachrichten
+    # noch Mitglieder vorhalten. Abgerufene Forum-Nachrichten hält forum_messages.
+    client_options = {
+        "max_messages": MEMORY_CONFIG.get("max_messages") or None,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False,
+    }
+
+# Im Sharding-Betrieb verwaltet AutoShardedBot die Shards dieses Prozesses
+BotBase = commands.AutoShardedBot if SHARDED else commands.Bot
+
+class StarboardBot(BotBase):
+    async def setup_hook(self):
+        # Vor dem Gateway-Login: Reaktionen treffen erst ein, wenn der Pool steht
+        await connect_database()
+        mapping_writer.start()
+        coordinator.start()
+        self.loop.create_task(star_reconcile_loop())
+        self.loop.create_task(event_loop_lag_loop())
+        if metrics_store is not None:
+            metrics_store.start()
+        if metrics_exporter is not None:
+            try:
+                await metrics_exporter.start()
+            except OSError as e:
+                logger.error(f"Metrik-Endpunkt konnte nicht gestartet werden: {e}")
+
+    async def close(self):
+        # Reihenfolge: erst alles abarbeiten, was noch Discord-Aufrufe oder Mapping-Änderungen erzeugt,
+        # dann Outbound und Write-Behind beenden, zuletzt die Datenbank
+        timeout = DISPATCHER_CONFIG.get("shutdown_timeout", 30.0)
+        if database_connect_task is not None:
+            database_connect_task.cancel()
+        await retry_queue.stop()  # keine neuen Wiederholungen mehr einreihen
+        # Bursts im Debounce-Fenster sofort einreihen und abarbeiten
+        await update_coalescer.flush_all()
+        await drain_starboard_updates(timeout)
+        # Nicht abgewartete Edits abschicken; nach einem gescheiterten Edit neu erstellte Posts laufen erneut über den Dispatcher
+        if not await outbound.drain(timeout):
+            logger.warning(f"Beim Herunterfahren noch {outbound.queue_depth()} Discord-Aufrufe offen.")
+        if edit_failure_tasks:
+            await asyncio.gather(*edit_failure_tasks, return_exceptions=True)
+        await drain_starboard_updates(timeout)
+        await starboard_dispatcher.stop()
+        await outbound.stop()
+        # Ausstehende Mapping-Änderungen erst schreiben, wenn keine Updates mehr laufen
+        await mapping_writer.close()
+        await retry_queue.stop()  # Fehlschläge aus dem Abarbeiten noch speichern
+        await coordinator.stop()
+        if metrics_exporter is not None:
+            await metrics_exporter.stop()
+        if metrics_store is not None:
+            await metrics_store.close()
+        await database.close()
+        chart_renderer.shutdown()
+        await super().close()
+
+shard_options = {}
+if SHARDED:
+    shard_options = {"shard_ids": SHARD_IDS, "shard_count": SHARD_COUNT}
+    logger.info(f"Sharding aktiv: Shards {SHARD_IDS or 'alle'} von {SHARD_COUNT or 'automatisch'} (Prozess {PROCESS_INDEX}).")
+
+bot = StarboardBot(command_prefix=PREFIX, intents=intents, **client_options, **shard_options)
 bot.remove_command("help")  # Entferne den Standard-Help-Command
 
 # ------------------------
 # Periodischer Task für Systemressourcen
 # ------------------------
+system_usage_task = None
+
 async def system_usage_loop():
     """Misst in regelmäßigen Abständen CPU- und RAM-Verbrauch."""
+    monitor.record_system_usage()
+    logger.info(f"RSS nach dem Start: {monitor.startup_rss_mb:.1f} MB (Lean-Modus: {'an' if LEAN_MODE else 'aus'}).")
     while True:
-        monitor.record_system_usage()
         await asyncio.sleep(30)  # Alle 30 Sekunden messen
+        monitor.record_system_usage()
+
+async def event_loop_lag_loop(interval: float = 1.0):
+    """Misst, wie stark sich ein asyncio.sleep gegenüber dem Soll verspätet."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        monitor.record_loop_lag(max(0.0, loop.time() - expected))
 
 # ------------------------
 # PostgreSQL-Funktionen für das Starboard-Mapping (mit Monitoring)
 # ------------------------
-async def get_mapping(message_id: int):
+async def get_mapping(guild_id: int, message_id: int, connection=None):
+    cached = mapping_cache.get(message_id)
+    if cached is not MISS:
+        return cached
+    pending = mapping_writer.pending_value(message_id)
+    if pending is not NOT_PENDING:
+        mapping_cache.set(message_id, pending)
+        return pending
     start = time.perf_counter()
-    async with db_pool.acquire() as connection:
-        row = await connection.fetchrow(
-            "SELECT starboard_message_id FROM starboard_mapping WHERE message_id = $1", message_id
-        )
+    with tracer.span("db.get_mapping"):
+        row = await database.fetchrow("get_mapping", guild_id, message_id, connection=connection)
     duration = time.perf_counter() - start
     monitor.record_db_query(duration)
-    return row["starboard_message_id"] if row else None
+    starboard_message_id = row["starboard_message_id"] if row else None
+    mapping_cache.set(message_id, starboard_message_id)
+    return starboard_message_id
+
+async def upsert_mapping(guild_id: int, message_id: int, starboard_message_id: int, stars: int, author_id: int = None,
+                         connection=None):
+    known = mapping_cache.get(message_id)
+    if known is MISS:
+        known = mapping_writer.pending_value(message_id)
+    mapping_cache.set(message_id, starboard_message_id)
+    mapping_writer.upsert(message_id, guild_id, starboard_message_id, stars, author_id)
+    # Reine Zähler-Änderungen schreibt der Write-Behind-Puffer gebündelt. Ein neuer oder ersetzter Post wird
+    # sofort geschrieben: ginge dieses Mapping verloren, entstünde beim nächsten Stern ein doppelter Post.
+    if known != starboard_message_id:
+        with tracer.span("db.flush"):
+            await mapping_writer.flush(connection=connection)
+
+async def remove_mapping(message_id: int):
+    mapping_cache.set(message_id, None)
+    mapping_writer.remove(message_id)
 
-async def upsert_mapping(message_id: int, starboard_message_id: int, stars: int):
+@tracer.trace("db.get_mapping_stars")
+async def get_mapping_stars(guild_id: int, message_ids):
+    """Lädt die gespeicherten Sterne mehrerer Nachrichten mit einer Abfrage: {message_id: stars}."""
     start = time.perf_counter()
-    async with db_pool.acquire() as connection:
-        await connection.execute("""
-            INSERT INTO starboard_mapping(message_id, starboard_message_id, stars)
-            VALUES($1, $2, $3)
-            ON CONFLICT (message_id) DO UPDATE
-            SET starboard_message_id = EXCLUDED.starboard_message_id,
-                stars = EXCLUDED.stars,
-                updated_at = CURRENT_TIMESTAMP
-        """, message_id, starboard_message_id, stars)
+    rows = await database.fetch("get_mapping_stars", guild_id, message_ids)
     duration = time.perf_counter() - start
     monitor.record_db_query(duration)
+    return {row["message_id"]: row["stars"] for row in rows}
 
-async def remove_mapping(message_id: int):
+async def warm_up_mapping_cache(limit: int):
+    """Lädt die zuletzt aktualisierten Mappings in den Cache."""
+    if limit <= 0:
+        return
     start = time.perf_counter()
-    async with db_pool.acquire() as connection:
-        await connection.execute("DELETE FROM starboard_mapping WHERE message_id = $1", message_id)
+    rows = await database.fetch("recent_mappings", limit)
     duration = time.perf_counter() - start
     monitor.record_db_query(duration)
+    # Älteste zuerst einfügen, damit die neuesten Einträge am LRU-Ende landen
+    for row in reversed(rows):
+        mapping_cache.set(row["message_id"], row["starboard_message_id"])
+    logger.info(f"Mapping-Cache mit {len(rows)} Einträgen vorgewärmt.")
+
+async def assign_legacy_mappings(legacy_guild_id: int = None):
+    """Ordnet Mappings ohne guild_id (aus der Zeit vor mehreren Guilds) der ersten Guild zu."""
+    if legacy_guild_id is None:
+        return
+    result = await database.assign_legacy_guild(legacy_guild_id)
+    if result != "UPDATE 0":
+        logger.info(f"Bestehende Mappings der Guild {legacy_guild_id} zugeordnet ({result}).")
+
+async def seed_legacy_guild():
+    """Übernimmt die Werte aus config.json einmalig für die Guild des dort eingetragenen Forums."""
+    if not LEGACY_FORUM_CHANNEL_ID:
+        return None
+    forum = bot.get_channel(LEGACY_FORUM_CHANNEL_ID)
+    if forum is None:
+        logger.warning(f"Forum-Channel {LEGACY_FORUM_CHANNEL_ID} aus {CONFIG_FILE} nicht gefunden.")
+        return None
+    if forum.guild.id not in guild_configs:
+        await guild_configs.update(
+            forum.guild.id,
+            forum_channel_id=LEGACY_FORUM_CHANNEL_ID,
+            starboard_channel_id=LEGACY_STARBOARD_CHANNEL_ID,
+            star_threshold=DEFAULT_STAR_THRESHOLD
+        )
+        logger.info(f"Einstellungen aus {CONFIG_FILE} für Guild {forum.guild.id} übernommen.")
+    return forum.guild.id
 
 # ------------------------
-# Hilfsfunktion: Prüfen, ob eine Nachricht im Ziel-Forum ist
+# Index der Threads in den Ziel-Foren aller Guilds: Prüfen, ob ein Channel dazugehört
 # ------------------------
-def is_in_target_forum(message: discord.Message):
-    if isinstance(message.channel, discord.Thread):
-        if message.channel.parent is not None:
-            logger.info(f"Thread-Parent-ID: {message.channel.parent.id}, Typ: {message.channel.parent.type}")
-            return (message.channel.parent.id == FORUM_CHANNEL_ID and 
-                    message.channel.parent.type == discord.ChannelType.forum)
-        else:
-            logger.info("Nachricht in einem Thread ohne Parent.")
-            return False
-    return False
+forum_threads = ForumThreadIndex()
+
+def rebuild_forum_index():
+    forum_ids = guild_configs.forum_channel_ids()
+    threads = []
+    for forum_id in forum_ids:
+        forum = bot.get_channel(forum_id)
+        if isinstance(forum, discord.ForumChannel):
+            threads.extend(forum.threads)
+    forum_threads.rebuild(forum_ids, threads)
+    logger.info(f"Forum-Index mit {len(forum_threads)} Threads aus {len(forum_ids)} Foren aufgebaut.")
+
+def apply_forum_change(previous_forum_id, forum_channel_id):
+    """Tauscht das Forum einer Guild im Index aus."""
+    if previous_forum_id is not None and previous_forum_id != forum_channel_id:
+        forum_threads.remove_forum(previous_forum_id)
+    forum = bot.get_channel(forum_channel_id) if forum_channel_id else None
+    if isinstance(forum, discord.ForumChannel):
+        forum_threads.add_forum(forum.id, forum.threads)
+
+def is_in_target_forum(guild_id: int, channel_id: int):
+    """O(1)-Prüfung anhand von Guild- und Channel-ID, ohne REST-Aufruf."""
+    if channel_id in forum_threads:
+        return True
+    # Thread noch nicht im Index (z.B. gerade aus dem Archiv geholt) -> nur in Guilds mit Ziel-Forum den Thread-Cache fragen
+    if guild_configs.get(guild_id).forum_channel_id not in forum_threads.forum_channel_ids:
+        return False
+    guild = bot.get_guild(guild_id)
+    thread = guild.get_thread(channel_id) if guild is not None else None
+    return thread is not None and forum_threads.update_thread(thread)
+
+def get_guild_channel(guild_id: int, channel_id: int):
+    """Channel oder Thread einer Guild per Dict-Lookup (bot.get_channel durchsucht alle Guilds)."""
+    guild = bot.get_guild(guild_id)
+    return guild.get_channel_or_thread(channel_id) if guild is not None else None
 
 # ------------------------
-# Starboard-Update-Funktion mit Performance-Messung
+# Stern-Zähler aus Gateway-Payloads
 # ------------------------
-async def update_starboard_message(message: discord.Message):
-    start_update = time.perf_counter()
-    # Suche nach der STAR-Emoji-Reaktion
-    star_reaction = None
+star_tracker = StarCountTracker(max_size=STAR_TRACKER_CONFIG.get("max_size", 50000))
+
+def count_stars(message: discord.Message):
     for reaction in message.reactions:
         if str(reaction.emoji) == STAR_EMOJI:
-            star_reaction = reaction
-            break
+            return reaction.count
+    return 0
+
+async def star_reconcile_loop():
+    """Gleicht die Stern-Zähler in großen Abständen mit den echten Nachrichten ab."""
+    await bot.wait_until_ready()
+    interval = STAR_TRACKER_CONFIG.get("reconcile_interval", 600)
+    max_age = STAR_TRACKER_CONFIG.get("reconcile_max_age", 3600)
+    batch_size = STAR_TRACKER_CONFIG.get("reconcile_batch_size", 20)
+    while True:
+        await asyncio.sleep(interval)
+        for message_id, guild_id, channel_id in star_tracker.due_for_reconcile(max_age, batch_size):
+            channel = get_guild_channel(guild_id, channel_id)
+            if channel is None:
+                star_tracker.forget(message_id)
+                continue
+            try:
+                with tracer.span("discord.fetch_message"):
+                    message = await channel.fetch_message(message_id)
+            except discord.NotFound:
+                star_tracker.forget(message_id)
+                continue
+            except Exception as e:
+                logger.error(f"Fehler beim Abgleich der Sterne für Nachricht {message_id}: {e}")
+                continue
+            forum_messages.set(message)
+            if star_tracker.reconcile(message_id, count_stars(message)):
+                monitor.record_star_reconcile_correction()
+                logger.info(f"Stern-Zähler für Nachricht {message_id} korrigiert: {star_tracker.get(message_id)}")
+                update_coalescer.submit(message_id, (guild_id, channel_id, message))
+
+# ------------------------
+# Starboard-Update-Funktion mit Performance-Messung
+# ------------------------
+# Rate-Limit-bewusster Scheduler für send/edit/delete: ein Bucket pro Starboard-Channel
+outbound = OutboundScheduler(
+    rate=OUTBOUND_CONFIG.get("rate", 5),
+    per=OUTBOUND_CONFIG.get("per", 5.0)
+)
+
+# Zuletzt gerenderter Stand pro Starboard-Post, um identische Edits zu überspringen
+rendered_posts = RenderedPostCache(max_size=MAPPING_CACHE_CONFIG.get("max_size", 10000))
 
-    starboard_channel = bot.get_channel(STARBOARD_CHANNEL_ID)
+# Bereits abgerufene Forum-Nachrichten (Inhalt und Autor für das Embed)
+forum_messages = RecentMessageCache(max_size=MEMORY_CONFIG.get("message_cache_size", 200))
+
+async def delete_starboard_post(starboard_channel, guild_id: int, message_id: int, count: int, connection=None):
+    starboard_message_id = await get_mapping(guild_id, message_id, connection=connection)
+    if not starboard_message_id:
+        return
+    logger.info(f"Versuche, Starboard-Post {starboard_message_id} für Nachricht {message_id} zu löschen (Sterne: {count}).")
+    try:
+        # Löschen über ein PartialMessage-Handle, ohne den Post vorher abzurufen
+        star_msg = starboard_channel.get_partial_message(starboard_message_id)
+        with tracer.span("discord.delete"):
+            await outbound.submit(starboard_channel.id, PRIORITY_DELETE, star_msg.delete,
+                                  coalesce_key=("delete", starboard_message_id))
+        monitor.record_avoided_fetch()
+        logger.info(f"Starboard-Post für Nachricht {message_id} gelöscht (Sterne: {count}).")
+    except discord.Forbidden:
+        logger.error("Bot hat keine Berechtigung, den Starboard-Post zu löschen!")
+    except discord.NotFound:
+        logger.warning(f"Starboard-Post für Nachricht {message_id} nicht gefunden.")
+    rendered_posts.forget(starboard_message_id)
+    await remove_mapping(message_id)
+
+# Futures der eingereihten Edits; zusammengefasste Edits teilen sich ein Future
+pending_edits = set()
+edit_failure_tasks = set()
+
+def track_starboard_edit(edit, guild_id: int, channel_id: int, message_id: int, starboard_message_id: int):
+    if edit in pending_edits:
+        return
+    pending_edits.add(edit)
+    edit.add_done_callback(functools.partial(
+        starboard_edit_done, guild_id, channel_id, message_id, starboard_message_id))
+
+def starboard_edit_done(guild_id: int, channel_id: int, message_id: int, starboard_message_id: int, edit):
+    pending_edits.discard(edit)
+    if edit.cancelled() or edit.exception() is None:
+        return
+    # Der gerenderte Stand ist nicht angekommen
+    rendered_posts.forget(starboard_message_id)
+    task = asyncio.create_task(handle_failed_edit(guild_id, channel_id, message_id, starboard_message_id, edit.exception()))
+    edit_failure_tasks.add(task)
+    task.add_done_callback(edit_failure_tasks.discard)
+
+async def handle_failed_edit(guild_id: int, channel_id: int, message_id: int, starboard_message_id: int, error: Exception):
+    if isinstance(error, discord.NotFound):
+        # Post wurde gelöscht: Mapping verwerfen, das nächste Update legt einen neuen Post an
+        logger.warning(f"Starboard-Post {starboard_message_id} für Nachricht {message_id} nicht gefunden, wird neu erstellt.")
+        try:
+            if await get_mapping(guild_id, message_id) == starboard_message_id:
+                await remove_mapping(message_id)
+        except Exception as e:
+            logger.error(f"Fehler beim Verwerfen des Mappings für Nachricht {message_id}: {e}")
+            retry_queue.record_failure(message_id, guild_id, channel_id, e)
+            return
+        await starboard_dispatcher.submit(message_id, (guild_id, channel_id, None))
+    elif is_transient_error(error):
+        retry_queue.record_failure(message_id, guild_id, channel_id, error)
+    else:
+        if isinstance(error, discord.Forbidden):
+            logger.error("Bot hat keine Berechtigung, den Starboard-Post zu bearbeiten!")
+        else:
+            logger.error(f"Fehler beim Bearbeiten des Starboard-Posts für Nachricht {message_id}: {error}")
+        retry_queue.give_up(message_id, error)
+
+@tracer.trace("update")
+async def update_starboard_message(guild_id: int, channel_id: int, message_id: int, message: discord.Message = None):
+    # Serialisiert Updates derselben Nachricht auch über Prozessgrenzen hinweg. Alle Datenbankzugriffe
+    # des Updates laufen über die Lock-Verbindung, damit es nie auf eine zweite Verbindung aus dem Pool wartet.
+    async with coordinator.message_lock(message_id) as connection:
+        await sync_starboard_post(guild_id, channel_id, message_id, message, connection=connection)
+        if coordinator.enabled:
+            # Das Mapping muss vor Freigabe des Locks für andere Prozesse sichtbar sein
+            with tracer.span("db.flush"):
+                await mapping_writer.flush(connection=connection)
+
+async def sync_starboard_post(guild_id: int, channel_id: int, message_id: int, message: discord.Message = None,
+                              connection=None):
+    start_update = time.perf_counter()
+    settings = guild_configs.get(guild_id)
+    starboard_channel = get_guild_channel(guild_id, settings.starboard_channel_id) if settings.starboard_channel_id else None
     if not starboard_channel:
-        logger.error("Starboard Channel nicht gefunden!")
+        logger.error(f"Starboard Channel für Guild {guild_id} nicht gefunden!")
         return
 
-    # Falls keine STAR-Reaktion vorhanden ist -> ggf. Post löschen
-    if star_reaction is None:
-        logger.info(f"Keine STAR-Emoji-Reaktion in Nachricht {message.id} gefunden.")
-        starboard_message_id = await get_mapping(message.id)
-        if starboard_message_id:
-            logger.info(f"Versuche, Starboard-Post {starboard_message_id} für Nachricht {message.id} zu löschen (keine Reaktionen).")
-            try:
-                star_msg = await starboard_channel.fetch_message(starboard_message_id)
-                await star_msg.delete()
-                logger.info(f"Starboard-Post für Nachricht {message.id} gelöscht.")
-            except discord.Forbidden:
-                logger.error("Bot hat keine Berechtigung, den Starboard-Post zu löschen!")
-            except discord.NotFound:
-                logger.warning(f"Starboard-Post für Nachricht {message.id} nicht gefunden.")
-            await remove_mapping(message.id)
+    count = star_tracker.get(message_id)
+    if count is None:
+        # Zähler unbekannt (vergessen, verdrängt oder invalidiert): aus der Nachricht übernehmen, nicht 0 annehmen
+        channel = get_guild_channel(guild_id, channel_id)
+        if channel is None:
+            logger.error("Channel nicht gefunden!")
+            return
+        try:
+            with tracer.span("discord.fetch_message"):
+                message = await channel.fetch_message(message_id)
+        except discord.NotFound:
+            logger.warning(f"Nachricht {message_id} existiert nicht mehr.")
+            return
+        monitor.record_star_seed_fetch()
+        forum_messages.set(message)
+        count = count_stars(message)
+        star_tracker.seed(message_id, guild_id, channel_id, count)
+    logger.debug(f"Star-Emoji-Zähler für Nachricht {message_id}: {count}")
+
+    # Falls Sterne < Threshold -> Post löschen (ohne die Nachricht abzurufen)
+    if count < settings.star_threshold:
+        await delete_starboard_post(starboard_channel, guild_id, message_id, count, connection=connection)
         monitor.record_update(time.perf_counter() - start_update)
         return
 
-    count = star_reaction.count
-    logger.info(f"Star-Emoji-Zähler für Nachricht {message.id}: {count}")
+    starboard_message_id = await get_mapping(guild_id, message_id, connection=connection)
+    rendered = rendered_posts.get(starboard_message_id) if starboard_message_id else None
 
-    # Falls Sterne < Threshold -> Post löschen
-    if count < STAR_THRESHOLD:
-        starboard_message_id = await get_mapping(message.id)
-        if starboard_message_id:
-            logger.info(f"Versuche, Starboard-Post {starboard_message_id} für Nachricht {message.id} zu löschen (Sterne: {count}).")
-            try:
-                star_msg = await starboard_channel.fetch_message(starboard_message_id)
-                await star_msg.delete()
-                logger.info(f"Starboard-Post für Nachricht {message.id} gelöscht (Sterne: {count}).")
-            except discord.Forbidden:
-                logger.error("Bot hat keine Berechtigung, den Starboard-Post zu löschen!")
-            except discord.NotFound:
-                logger.warning(f"Starboard-Post für Nachricht {message.id} nicht gefunden.")
-            await remove_mapping(message.id)
+    # Gleicher Zähler und kein neuer Nachrichteninhalt -> nichts Sichtbares hat sich geändert
+    if message is None and rendered is not None and rendered[0] == count:
+        monitor.record_skipped_edit()
+        monitor.record_avoided_fetch()
+        logger.debug(f"Starboard-Post für Nachricht {message_id} ist aktuell (Sterne: {count}).")
         monitor.record_update(time.perf_counter() - start_update)
         return
 
-    # Erstelle ein Embed
-    embed = discord.Embed(title="Top-Beitrag", color=0xFFD700)
-    embed.add_field(name="Autor", value=message.author.mention, inline=True)
-    embed.add_field(name="Sterne", value=str(count), inline=True)
-    embed.add_field(name="Channel", value=message.channel.mention, inline=True)
-    embed.description = message.content
-    embed.set_footer(text=f"Nachrichten-ID: {message.id}")
-
-    # Aktualisiere oder erstelle neuen Starboard-Post
-    starboard_message_id = await get_mapping(message.id)
-    if starboard_message_id:
+    # Nachrichteninhalt wird nur für das Embed benötigt
+    if message is None:
+        message = forum_messages.get(message_id)
+        if message is not None:
+            monitor.record_avoided_fetch()
+    if message is None:
+        channel = get_guild_channel(guild_id, channel_id)
+        if channel is None:
+            logger.error("Channel nicht gefunden!")
+            return
         try:
-            star_msg = await starboard_channel.fetch_message(starboard_message_id)
-            await star_msg.edit(content=f"{STAR_EMOJI} {count}", embed=embed)
-            logger.info(f"Starboard-Post für Nachricht {message.id} aktualisiert (Sterne: {count}).")
-            await upsert_mapping(message.id, starboard_message_id, count)
+            with tracer.span("discord.fetch_message"):
+                message = await channel.fetch_message(message_id)
         except discord.NotFound:
-            new_msg = await starboard_channel.send(content=f"{STAR_EMOJI} {count}", embed=embed)
-            await upsert_mapping(message.id, new_msg.id, count)
-            logger.info(f"Neuer Starboard-Post für Nachricht {message.id} erstellt (Sterne: {count}).")
+            logger.warning(f"Nachricht {message_id} existiert nicht mehr.")
+            star_tracker.forget(message_id)
+            return
+        forum_messages.set(message)
+
+    fingerprint = render_fingerprint(count, message.content, message.author.id)
+    if rendered is not None and rendered[1] == fingerprint:
+        monitor.record_skipped_edit()
+        logger.debug(f"Starboard-Post für Nachricht {message_id} ist aktuell (Sterne: {count}).")
+        monitor.record_update(time.perf_counter() - start_update)
+        return
+
+    # Erstelle ein Embed
+    with tracer.span("embed"):
+        embed = discord.Embed(title="Top-Beitrag", color=0xFFD700)
+        embed.add_field(name="Autor", value=message.author.mention, inline=True)
+        embed.add_field(name="Sterne", value=str(count), inline=True)
+        embed.add_field(name="Channel", value=message.channel.mention, inline=True)
+        embed.description = message.content
+        embed.set_footer(text=f"Nachrichten-ID: {message.id}")
+
+    # Aktualisiere oder erstelle neuen Starboard-Post (über den Outbound-Scheduler)
+    content = f"{STAR_EMOJI} {count}"
+    send_post = lambda: starboard_channel.send(content=content, embed=embed)
+    if starboard_message_id:
+        # Edit über ein PartialMessage-Handle, ohne den Post vorher abzurufen. Der Worker wartet
+        # nicht auf den Edit: ein noch wartender Edit desselben Posts wird durch den neuen ersetzt.
+        star_msg = starboard_channel.get_partial_message(starboard_message_id)
+
+        async def edit_post():
+            with tracer.span("discord.edit"):
+                return await star_msg.edit(content=content, embed=embed)
+
+        edit = outbound.submit(starboard_channel.id, PRIORITY_EDIT, edit_post,
+                               coalesce_key=("edit", starboard_message_id))
+        track_starboard_edit(edit, guild_id, channel_id, message_id, starboard_message_id)
+        monitor.record_avoided_fetch()
+        rendered_posts.set(starboard_message_id, count, fingerprint)
+        logger.debug(f"Edit des Starboard-Posts für Nachricht {message.id} eingereiht (Sterne: {count}).")
+        await upsert_mapping(guild_id, message.id, starboard_message_id, count, message.author.id,
+                             connection=connection)
     else:
-        new_msg = await starboard_channel.send(content=f"{STAR_EMOJI} {count}", embed=embed)
-        await upsert_mapping(message.id, new_msg.id, count)
+        with tracer.span("discord.send"):
+            new_msg = await outbound.submit(starboard_channel.id, PRIORITY_SEND, send_post)
+        rendered_posts.set(new_msg.id, count, fingerprint)
+        await upsert_mapping(guild_id, message.id, new_msg.id, count, message.author.id,
+                             connection=connection)
         logger.info(f"Starboard-Post für Nachricht {message.id} erstellt (Sterne: {count}).")
 
     monitor.record_update(time.perf_counter() - start_update)
 
 # ------------------------
-# Bot-Events
+# Arbeitswarteschlange: serialisiert pro Nachricht, parallel über Nachrichten
 # ------------------------
-@bot.event
-async def on_ready():
-    global db_pool
-    logger.info(f"Bot ist online als {bot.user}")
+def merge_update_items(old_item, new_item):
+    # Eine bereits abgerufene Nachricht bleibt erhalten, der Zähler kommt ohnehin aus dem Tracker
+    guild_id, channel_id, message = new_item
+    return guild_id, channel_id, message or old_item[2]
+
+# Vorübergehende Fehler: Datenbank nicht erreichbar, 5xx von Discord, Zeitüberschreitungen
+TRANSIENT_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    aiohttp.ClientError,
+    discord.DiscordServerError,
+    # Verbindungsabbrüche (auch ConnectionDoesNotExistError); InterfaceError ist Fehlbedienung und bleibt ein Fehler
+    asyncpg.PostgresConnectionError,
+    asyncpg.TooManyConnectionsError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.QueryCanceledError,
+    asyncpg.DeadlockDetectedError,
+)
+
+def is_transient_error(error: Exception):
+    return isinstance(error, TRANSIENT_ERRORS)
+
+async def process_starboard_update(message_id: int, item):
+    guild_id, channel_id, message = item
     try:
-        db_pool = await asyncpg.create_pool(
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            database=DB_CONFIG["database"],
-            host=DB_CONFIG["host"],
-            port=DB_CONFIG["port"]
-        )
-        logger.info("Datenbankverbindung hergestellt.")
+        await update_starboard_message(guild_id, channel_id, message_id, message)
     except Exception as e:
-        logger.error(f"Fehler beim Erstellen der DB-Pool: {e}")
+        if is_transient_error(e):
+            retry_queue.record_failure(message_id, guild_id, channel_id, e)
+            return
+        retry_queue.give_up(message_id, e)
+        raise
+    retry_queue.record_success(message_id)
 
-    # Starte den Loop für Systemressourcen
-    bot.loop.create_task(system_usage_loop())
+starboard_dispatcher = KeyedDispatcher(
+    process_starboard_update,
+    workers=DISPATCHER_CONFIG.get("workers", 4),
+    max_queue_size=DISPATCHER_CONFIG.get("max_queue_size", 1000),
+    overflow_policy=DISPATCHER_CONFIG.get("overflow_policy", "drop_oldest"),
+    merge=merge_update_items
+)
 
-@bot.event
-async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
-    logger.info(f"[on_raw_reaction_add] Reaktion {payload.emoji} von User {payload.user_id} in Channel {payload.channel_id} hinzugefügt.")
-    if str(payload.emoji) != STAR_EMOJI:
-        return
-    channel = bot.get_channel(payload.channel_id)
+async def drain_starboard_updates(timeout: float):
+    if not await starboard_dispatcher.drain(timeout=timeout):
+        logger.warning(f"Beim Herunterfahren noch {starboard_dispatcher.queue_depth()} Starboard-Updates offen.")
+
+# ------------------------
+# Retry-Warteschlange: gescheiterte Updates dauerhaft vormerken und mit Backoff nachholen
+# ------------------------
+async def retry_starboard_update(message_id: int, guild_id: int, channel_id: int):
+    """Reicht ein vorgemerktes Update erneut ein. Gibt False zurück, wenn es nicht eingereiht wurde."""
+    message = None
+    if not star_tracker.is_tracked(message_id):
+        # Nach einem Neustart ist der Zähler unbekannt: wie beim Erstkontakt aus der Nachricht übernehmen
+        channel = get_guild_channel(guild_id, channel_id)
+        if channel is None:
+            retry_queue.give_up(message_id, f"Channel {channel_id} nicht gefunden")
+            return True
+        try:
+            with tracer.span("discord.fetch_message"):
+                message = await channel.fetch_message(message_id)
+        except discord.NotFound:
+            retry_queue.discard(message_id)
+            return True
+        monitor.record_star_seed_fetch()
+        forum_messages.set(message)
+        star_tracker.seed(message_id, guild_id, channel_id, count_stars(message))
+    return await starboard_dispatcher.submit(message_id, (guild_id, channel_id, message))
+
+retry_queue = RetryQueue(
+    database.get_pool,
+    retry_starboard_update,
+    is_transient_error,
+    base_delay=RETRY_CONFIG.get("base_delay", 5.0),
+    max_delay=RETRY_CONFIG.get("max_delay", 600.0),
+    max_attempts=RETRY_CONFIG.get("max_attempts", 12),
+    max_concurrency=RETRY_CONFIG.get("max_concurrency", 4),
+    poll_interval=RETRY_CONFIG.get("poll_interval", 1.0),
+    in_flight_timeout=RETRY_CONFIG.get("in_flight_timeout", 300.0)
+)
+
+# ------------------------
+# Debounce: Reaktions-Bursts pro Nachricht zusammenfassen
+# ------------------------
+async def flush_starboard_update(message_id: int, item):
+    await starboard_dispatcher.submit(message_id, item)
+
+update_coalescer = UpdateCoalescer(
+    flush_starboard_update,
+    quiet_window=COALESCE_CONFIG.get("quiet_window", 1.5),
+    max_delay=COALESCE_CONFIG.get("max_delay", 10.0),
+    merge=merge_update_items
+)
+
+@tracer.trace("reaction")
+async def handle_star_reaction(payload: discord.RawReactionActionEvent, delta: int):
+    """Aktualisiert den Stern-Zähler und plant ein Starboard-Update. Gibt False zurück, wenn das Event ignoriert wird."""
+    if payload.guild_id is None or not is_in_target_forum(payload.guild_id, payload.channel_id):
+        monitor.record_rejected_early()
+        logger.debug(f"Channel {payload.channel_id} gehört nicht zum Ziel-Forum.")
+        return False
+    if not database.ready:
+        monitor.record_db_unavailable()
+        logger.warning(f"Reaktion auf Nachricht {payload.message_id} ignoriert: keine Datenbankverbindung.")
+        return False
+    channel = get_guild_channel(payload.guild_id, payload.channel_id)
     if channel is None:
         logger.error("Channel nicht gefunden!")
-        return
+        return False
+
+    if star_tracker.apply_delta(payload.message_id, delta) is not None:
+        update_coalescer.submit(payload.message_id, (payload.guild_id, payload.channel_id, None))
+        return True
+
+    # Erstkontakt: Nachricht einmalig abrufen und den Zähler daraus initialisieren
     try:
-        message = await channel.fetch_message(payload.message_id)
+        with tracer.span("discord.fetch_message"):
+            message = await channel.fetch_message(payload.message_id)
     except Exception as e:
         logger.error(f"Fehler beim Abrufen der Nachricht: {e}")
+        if is_transient_error(e):
+            # Der Retry übernimmt den Zähler später aus der Nachricht
+            retry_queue.record_failure(payload.message_id, payload.guild_id, payload.channel_id, e)
+        return False
+    monitor.record_star_seed_fetch()
+    forum_messages.set(message)
+    star_tracker.seed(message.id, payload.guild_id, channel.id, count_stars(message))
+    update_coalescer.submit(message.id, (payload.guild_id, channel.id, message))
+    return True
+
+async def handle_star_clear(guild_id: int, channel_id: int, message_id: int):
+    """Alle Sterne einer Nachricht wurden entfernt."""
+    if guild_id is None or not is_in_target_forum(guild_id, channel_id):
+        monitor.record_rejected_early()
         return
-    if not is_in_target_forum(message):
-        logger.info("Nachricht befindet sich nicht im Ziel-Forum.")
+    if not database.ready:
+        monitor.record_db_unavailable()
         return
-    monitor.record_reaction_add()
-    await update_starboard_message(message)
+    if not star_tracker.is_tracked(message_id):
+        # Ohne bestehenden Starboard-Post gibt es nichts zu tun
+        if await get_mapping(guild_id, message_id) is None:
+            return
+        star_tracker.seed(message_id, guild_id, channel_id, 0)
+    star_tracker.reset(message_id)
+    update_coalescer.submit(message_id, (guild_id, channel_id, None))
 
-@bot.event
-async def on_raw_reaction_remove(payload: discord.RawReactionActionEvent):
-    logger.info(f"[on_raw_reaction_remove] Reaktion {payload.emoji} von User {payload.user_id} in Channel {payload.channel_id} entfernt.")
-    if str(payload.emoji) != STAR_EMOJI:
+# ------------------------
+# Invalidierungen aus anderen Prozessen (LISTEN/NOTIFY)
+# ------------------------
+def invalidate_mappings(message_ids):
+    for value in message_ids:
+        message_id = int(value)
+        starboard_message_id = mapping_cache.invalidate(message_id)
+        if starboard_message_id:
+            rendered_posts.forget(starboard_message_id)
+        star_tracker.forget(message_id)
+        forum_messages.forget(message_id)
+
+async def invalidate_guild_configs(guild_ids):
+    for value in guild_ids:
+        guild_id = int(value)
+        previous_forum_id = guild_configs.get(guild_id).forum_channel_id
+        settings = await guild_configs.reload(guild_id)
+        apply_forum_change(previous_forum_id, settings.forum_channel_id)
+        logger.info(f"Einstellungen der Guild {guild_id} von einem anderen Prozess geändert, neu geladen.")
+
+async def reset_shared_caches():
+    """Nach einer unterbrochenen LISTEN-Verbindung können Invalidierungen fehlen."""
+    mapping_cache.clear()
+    rendered_posts.clear()
+    await guild_configs.load_all()
+    rebuild_forum_index()
+
+coordinator.on(MAPPING_CHANNEL, invalidate_mappings)
+coordinator.on(GUILD_CONFIG_CHANNEL, invalidate_guild_configs)
+coordinator.on_reconnect = reset_shared_caches
+
+# ------------------------
+# Bot-Events
+# ------------------------
+legacy_guild_seeded = False
+database_prepared = False  # Pool steht und Tabellen/Einstellungen sind geladen
+database_connect_task = None
+
+async def connect_database():
+    """Legt den Pool an und bringt alle Tabellen auf den aktuellen Stand (einmalig beim Start).
+
+    Ist die Datenbank beim Start nicht erreichbar, wird der Verbindungsaufbau
+    im Hintergrund mit Backoff wiederholt; bis dahin werden Reaktionen
+    verworfen (db_unavailable_events).
+    """
+    global database_connect_task
+    try:
+        await database.connect()
+    except Exception as e:
+        logger.error(f"Fehler beim Erstellen der DB-Pool: {e}")
+        database_connect_task = asyncio.create_task(reconnect_database(), name="database-connect")
         return
-    channel = bot.get_channel(payload.channel_id)
-    if channel is None:
-        logger.error("Channel nicht gefunden!")
+    logger.info("Datenbankverbindung hergestellt.")
+    await prepare_database()
+
+async def reconnect_database():
+    delay = DB_CONFIG.get("connect_retry_delay", 5.0)
+    max_delay = DB_CONFIG.get("connect_retry_max_delay", 300.0)
+    while True:
+        logger.info(f"Neuer Verbindungsversuch zur Datenbank in {delay:.1f} Sekunden.")
+        await asyncio.sleep(delay)
+        try:
+            await database.connect()
+            break
+        except Exception as e:
+            logger.error(f"Fehler beim Erstellen der DB-Pool: {e}")
+            delay = min(max_delay, delay * 2)
+    logger.info("Datenbankverbindung hergestellt.")
+    await prepare_database()
+    if bot.is_ready():
+        # on_ready lief ohne Datenbank: Einstellungen übernehmen und Forum-Index mit den geladenen Guilds neu aufbauen
+        await seed_legacy_settings()
+        rebuild_forum_index()
+
+async def seed_legacy_settings():
+    global legacy_guild_seeded
+    if not database_prepared or legacy_guild_seeded:
         return
     try:
-        message = await channel.fetch_message(payload.message_id)
+        await assign_legacy_mappings(await seed_legacy_guild())
+        legacy_guild_seeded = True
     except Exception as e:
-        logger.error(f"Fehler beim Abrufen der Nachricht: {e}")
+        logger.error(f"Fehler beim Übernehmen der Einstellungen aus {CONFIG_FILE}: {e}")
+
+async def prepare_database():
+    """Legt die übrigen Tabellen an und lädt Einstellungen, Mapping-Cache und Retry-Warteschlange."""
+    global database_prepared
+    try:
+        await guild_configs.ensure_schema()
+        await guild_configs.load_all()
+    except Exception as e:
+        logger.error(f"Fehler beim Laden der Guild-Einstellungen: {e}")
+    try:
+        await leaderboard.ensure_schema()
+    except Exception as e:
+        logger.error(f"Fehler beim Anlegen der Bestenlisten-Tabelle: {e}")
+    try:
+        await warm_up_mapping_cache(MAPPING_CACHE_CONFIG.get("warmup_size", 1000))
+    except Exception as e:
+        logger.error(f"Fehler beim Vorwärmen des Mapping-Caches: {e}")
+    try:
+        await resync_checkpoints.ensure_schema()
+    except Exception as e:
+        logger.error(f"Fehler beim Anlegen der Resync-Tabelle: {e}")
+    try:
+        await retry_queue.ensure_schema()
+        loaded = await retry_queue.load(SHARD_IDS, SHARD_COUNT)
+        if loaded:
+            logger.info(f"{loaded} fehlgeschlagene Starboard-Updates aus der Retry-Warteschlange übernommen.")
+    except Exception as e:
+        logger.error(f"Fehler beim Laden der Retry-Warteschlange: {e}")
+    if metrics_store is not None:
+        try:
+            await metrics_store.ensure_schema()
+        except Exception as e:
+            logger.error(f"Fehler beim Anlegen der Monitoring-Tabellen: {e}")
+    database_prepared = True
+
+def shard_id_for(guild_id: int):
+    guild = bot.get_guild(guild_id)
+    return guild.shard_id if guild is not None else 0
+
+@bot.event
+async def on_ready():
+    global system_usage_task
+    logger.info(f"Bot ist online als {bot.user}")
+
+    # Braucht den Channel-Cache; on_ready kann nach Reconnects erneut kommen
+    await seed_legacy_settings()
+
+    rebuild_forum_index()
+    # Erst mit gefülltem Channel-Cache: Einträge von vor einem Neustart brauchen den Thread
+    retry_queue.start()
+
+    # Starte den Loop für Systemressourcen
+    if system_usage_task is None:
+        system_usage_task = bot.loop.create_task(system_usage_loop())
+
+@bot.event
+async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
+    logger.debug(f"[on_raw_reaction_add] Reaktion {payload.emoji} von User {payload.user_id} in Channel {payload.channel_id} hinzugefügt.")
+    if str(payload.emoji) != STAR_EMOJI:
         return
-    if not is_in_target_forum(message):
-        logger.info("Nachricht befindet sich nicht im Ziel-Forum.")
+    if await handle_star_reaction(payload, 1):
+        monitor.record_reaction_add()
+        monitor.record_shard_event(shard_id_for(payload.guild_id))
+
+@bot.event
+async def on_raw_reaction_remove(payload: discord.RawReactionActionEvent):
+    logger.debug(f"[on_raw_reaction_remove] Reaktion {payload.emoji} von User {payload.user_id} in Channel {payload.channel_id} entfernt.")
+    if str(payload.emoji) != STAR_EMOJI:
         return
-    monitor.record_reaction_remove()
-    await update_starboard_message(message)
+    if await handle_star_reaction(payload, -1):
+        monitor.record_reaction_remove()
+        monitor.record_shard_event(shard_id_for(payload.guild_id))
+
+@bot.event
+async def on_raw_reaction_clear(payload: discord.RawReactionClearEvent):
+    logger.debug(f"[on_raw_reaction_clear] Alle Reaktionen in Nachricht {payload.message_id} entfernt.")
+    await handle_star_clear(payload.guild_id, payload.channel_id, payload.message_id)
+
+@bot.event
+async def on_raw_reaction_clear_emoji(payload: discord.RawReactionClearEmojiEvent):
+    if str(payload.emoji) != STAR_EMOJI:
+        return
+    logger.debug(f"[on_raw_reaction_clear_emoji] Alle {STAR_EMOJI}-Reaktionen in Nachricht {payload.message_id} entfernt.")
+    await handle_star_clear(payload.guild_id, payload.channel_id, payload.message_id)
+
+@bot.event
+async def on_raw_message_edit(payload: discord.RawMessageUpdateEvent):
+    # Inhalt geändert: beim nächsten Update neu abrufen
+    forum_messages.forget(payload.message_id)
+
+@bot.event
+async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent):
+    forum_messages.forget(payload.message_id)
+    retry_queue.discard(payload.message_id)
+
+@bot.event
+async def on_raw_bulk_message_delete(payload: discord.RawBulkMessageDeleteEvent):
+    for message_id in payload.message_ids:
+        forum_messages.forget(message_id)
+        retry_queue.discard(message_id)
+
+@bot.event
+async def on_shard_disconnect(shard_id: int):
+    monitor.record_shard_disconnect(shard_id)
+    logger.warning(f"Shard {shard_id} hat die Verbindung zum Gateway verloren.")
+
+# ------------------------
+# Thread- und Channel-Events für den Forum-Index
+# ------------------------
+@bot.event
+async def on_thread_create(thread: discord.Thread):
+    forum_threads.update_thread(thread)
+
+@bot.event
+async def on_thread_join(thread: discord.Thread):
+    forum_threads.update_thread(thread)
+
+@bot.event
+async def on_thread_update(before: discord.Thread, after: discord.Thread):
+    forum_threads.update_thread(after)
+
+@bot.event
+async def on_raw_thread_delete(payload: discord.RawThreadDeleteEvent):
+    forum_threads.discard(payload.thread_id)
+
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    if channel.id in forum_threads.forum_channel_ids:
+        logger.warning(f"Ziel-Forum {channel.id} der Guild {channel.guild.id} wurde gelöscht.")
+        forum_threads.remove_forum(channel.id)
 
 # ------------------------
 # Bot-Commands
@@ -275,11 +998,11 @@ async def on_raw_reaction_remove(payload: discord.RawReactionActionEvent):
 @bot.command(name="setthreshold")
 @commands.has_permissions(administrator=True)
 async def set_threshold(ctx, threshold: int):
-    global STAR_THRESHOLD
-    STAR_THRESHOLD = threshold
-    config["star_threshold"] = threshold
-    save_config(config)
-    logger.info(f"Administrator {ctx.author} hat den Stern-Schwellenwert auf {threshold} gesetzt.")
+    if not database.ready:
+        await ctx.send("Fehler: Keine Datenbankverbindung.")
+        return
+    await guild_configs.update(ctx.guild.id, star_threshold=threshold)
+    logger.info(f"Administrator {ctx.author} hat den Stern-Schwellenwert in Guild {ctx.guild.id} auf {threshold} gesetzt.")
     await ctx.send(f"Der Stern-Schwellenwert wurde auf {threshold} eingestellt.")
 
 @bot.command(name="setforum")
@@ -297,11 +1020,13 @@ async def set_forum_channel(ctx, *, channel_input: str):
         await ctx.send("Fehler: Der angegebene Channel ist kein Forum. Bitte erwähne einen Forum-Channel (z.B. #test-forum).")
         return
 
-    global FORUM_CHANNEL_ID
-    FORUM_CHANNEL_ID = channel.id
-    config["forum_channel_id"] = channel.id
-    save_config(config)
-    logger.info(f"Administrator {ctx.author} hat den Forum-Channel auf {channel.id} gesetzt.")
+    if not database.ready:
+        await ctx.send("Fehler: Keine Datenbankverbindung.")
+        return
+    previous_forum_id = guild_configs.get(ctx.guild.id).forum_channel_id
+    await guild_configs.update(ctx.guild.id, forum_channel_id=channel.id)
+    apply_forum_change(previous_forum_id, channel.id)
+    logger.info(f"Administrator {ctx.author} hat den Forum-Channel in Guild {ctx.guild.id} auf {channel.id} gesetzt.")
     await ctx.send(f"Forum-Channel-ID wurde auf {channel.id} gesetzt.")
 
 @set_forum_channel.error
@@ -317,10 +1042,11 @@ async def set_forum_channel_error(ctx, error):
 @bot.command(name="setstarboard")
 @commands.has_permissions(administrator=True)
 async def set_starboard_channel(ctx, channel: discord.TextChannel):
-    global STARBOARD_CHANNEL_ID
-    STARBOARD_CHANNEL_ID = channel.id
-    config["starboard_channel_id"] = channel.id
-    save_config(config)
+    if not database.ready:
+        await ctx.send("Fehler: Keine Datenbankverbindung.")
+        return
+    await guild_configs.update(ctx.guild.id, starboard_channel_id=channel.id)
+    logger.info(f"Administrator {ctx.author} hat den Starboard-Channel in Guild {ctx.guild.id} auf {channel.id} gesetzt.")
     
     perms = channel.permissions_for(ctx.guild.me)
     required_perms = {
@@ -348,25 +1074,277 @@ async def set_starboard_channel_error(ctx, error):
         logger.error(f"Unbekannter Fehler im setstarboard-Command: {error}")
         await ctx.send("Ein unbekannter Fehler ist aufgetreten. Bitte versuche es erneut.")
 
+# ------------------------
+# Resync Command: bestehende Forum-Threads mit dem Starboard abgleichen
+# ------------------------
+resync_checkpoints = ResyncCheckpointStore(database.get_pool)
+resync_runs = {}  # guild_id -> (Task, ResyncJob)
+
+async def collect_forum_threads(forum: discord.ForumChannel):
+    threads = {thread.id: thread for thread in forum.threads}
+    async for thread in forum.archived_threads(limit=None):
+        threads.setdefault(thread.id, thread)
+    return list(threads.values())
+
+async def apply_resync_update(guild_id: int, channel_id: int, message: discord.Message, count: int):
+    star_tracker.seed(message.id, guild_id, channel_id, count)
+    await starboard_dispatcher.submit(message.id, (guild_id, channel_id, message))
+
+async def run_resync(ctx, status_msg, job):
+    last_report = 0.0
+
+    async def report(progress):
+        nonlocal last_report
+        if time.monotonic() - last_report < RESYNC_CONFIG.get("progress_interval", 5):
+            return
+        last_report = time.monotonic()
+        try:
+            await status_msg.edit(content=f"Resync läuft … {progress.summary()}")
+        except discord.HTTPException:
+            pass
+
+    job.on_progress = report
+    try:
+        progress = await job.run()
+    except asyncio.CancelledError:
+        await status_msg.edit(content=f"Resync angehalten (fortsetzbar mit `!resync`). {job.progress.summary()}")
+        raise
+    except Exception as e:
+        logger.error(f"Fehler beim Resync: {e}")
+        await ctx.send(f"Fehler beim Resync (fortsetzbar mit `!resync`): {e}")
+        return
+    logger.info(f"Resync abgeschlossen: {progress.summary()}")
+    await status_msg.edit(content=f"Resync abgeschlossen. {progress.summary()}")
+
+@bot.command(name="resync")
+@commands.has_permissions(administrator=True)
+async def resync(ctx, modus: str = None):
+    guild_id = ctx.guild.id
+    resync_task, resync_job = resync_runs.get(guild_id, (None, None))
+    running = resync_task is not None and not resync_task.done()
+
+    if modus == "status":
+        if running:
+            await ctx.send(f"Resync läuft. {resync_job.progress.summary()}")
+        else:
+            await ctx.send("Kein Resync aktiv.")
+        return
+    if modus == "stop":
+        if running:
+            resync_task.cancel()
+        else:
+            await ctx.send("Kein Resync aktiv.")
+        return
+    if modus not in (None, "neu"):
+        await ctx.send("Fehler: Unbekannter Modus. Verwendung: `!resync [neu|status|stop]`")
+        return
+    if running:
+        await ctx.send("Es läuft bereits ein Resync. Status mit `!resync status`.")
+        return
+    if not database.ready:
+        await ctx.send("Fehler: Keine Datenbankverbindung.")
+        return
+
+    forum_channel_id = guild_configs.get(guild_id).forum_channel_id
+    forum = bot.get_channel(forum_channel_id) if forum_channel_id else None
+    if not isinstance(forum, discord.ForumChannel):
+        await ctx.send("Fehler: Kein gültiger Forum-Channel gesetzt. Bitte zuerst `!setforum` verwenden.")
+        return
+
+    if modus == "neu":
+        await resync_checkpoints.clear(forum.id)
+    checkpoint = await resync_checkpoints.load(forum.id)
+    threads = await collect_forum_threads(forum)
+    for thread in threads:
+        forum_threads.update_thread(thread)
+
+    resync_job = ResyncJob(
+        forum.id, threads, resync_checkpoints,
+        fetch_mappings=functools.partial(get_mapping_stars, guild_id),
+        apply=functools.partial(apply_resync_update, guild_id),
+        count_stars=count_stars,
+        get_threshold=lambda: guild_configs.get(guild_id).star_threshold,
+        backlog=starboard_dispatcher.queue_depth,
+        max_in_flight=RESYNC_CONFIG.get("max_in_flight", 20),
+        batch_size=RESYNC_CONFIG.get("batch_size", 100),
+        checkpoint=checkpoint
+    )
+    start_text = "Resync wird fortgesetzt" if checkpoint else "Resync gestartet"
+    status_msg = await ctx.send(f"{start_text}: {len(threads)} Threads im Forum.")
+    logger.info(f"Administrator {ctx.author} hat einen Resync in Guild {guild_id} gestartet ({len(threads)} Threads).")
+    resync_runs[guild_id] = (asyncio.create_task(run_resync(ctx, status_msg, resync_job)), resync_job)
+
+# ------------------------
+# Trace Command: Stufen-Latenzen und langsamste Traces
+# ------------------------
+@bot.command(name="trace")
+@commands.has_permissions(administrator=True)
+async def trace(ctx, modus: str = None, wert: str = None):
+    if modus in (None, "stufen"):
+        rows = tracer.stage_summary()
+        if not rows:
+            await ctx.send(f"Noch keine Traces aufgezeichnet (Sample-Rate: {tracer.sample_rate:.0%}).")
+            return
+        lines = [f"{'Stufe':<24}{'Anzahl':>8}{'Ø ms':>9}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}"]
+        for row in rows:
+            lines.append(f"{row['stage']:<24}{row['count']:>8}{row['mean'] * 1000:>9.1f}"
+                         f"{row['p50'] * 1000:>9.1f}{row['p99'] * 1000:>9.1f}{row['max'] * 1000:>9.1f}")
+        await ctx.send(f"**Stufen-Latenzen** (Sample-Rate: {tracer.sample_rate:.0%})\n```\n" + "\n".join(lines) + "\n```")
+    elif modus == "langsam":
+        limit = int(wert) if wert and wert.isdigit() else 3
+        slowest = tracer.slowest(limit)
+        if not slowest:
+            await ctx.send("Noch keine Traces aufgezeichnet.")
+            return
+        for timestamp, root in slowest:
+            text = format_trace(root)
+            if len(text) > 1900:
+                text = text[:1900] + "\n…"
+            await ctx.send(f"<t:{int(timestamp)}:T>\n```\n{text}\n```")
+    elif modus == "json":
+        file = discord.File(fp=BytesIO(tracer.export_json().encode()), filename="traces.json")
+        await ctx.send("Aufgezeichnete Traces:", file=file)
+    elif modus == "rate":
+        try:
+            rate = float(wert)
+        except (TypeError, ValueError):
+            rate = -1.0
+        if not 0.0 <= rate <= 1.0:
+            await ctx.send("Fehler: Die Sample-Rate muss zwischen 0 und 1 liegen. Beispiel: `!trace rate 0.1`")
+            return
+        tracer.sample_rate = rate
+        logger.info(f"Administrator {ctx.author} hat die Trace-Sample-Rate auf {rate} gesetzt.")
+        await ctx.send(f"Trace-Sample-Rate wurde auf {rate:.0%} gesetzt.")
+    elif modus == "reset":
+        tracer.reset()
+        await ctx.send("Traces zurückgesetzt.")
+    else:
+        await ctx.send("Fehler: Unbekannter Modus. Verwendung: `!trace [stufen|langsam [n]|json|rate <0-1>|reset]`")
+
+# ------------------------
+# Bestenlisten: !top und !topautoren
+# ------------------------
+leaderboard = LeaderboardStore(
+    database.get_pool,
+    page_size=LEADERBOARD_CONFIG.get("page_size", 10),
+    max_pages=LEADERBOARD_CONFIG.get("max_pages", 10),
+    cache_seconds=LEADERBOARD_CONFIG.get("cache_seconds", 60),
+    statement_timeout_ms=LEADERBOARD_CONFIG.get("statement_timeout_ms", 2000)
+)
+
+async def resolve_leaderboard_args(ctx, zeitraum, seite):
+    """Gibt (Sekunden oder None, Seite) zurück bzw. None bei ungültiger Eingabe. `!top 2` blättert ohne Zeitraum."""
+    if zeitraum is not None and zeitraum.isdigit():
+        zeitraum, seite = None, int(zeitraum)
+    if zeitraum is None or zeitraum == "alle":
+        return None, seite
+    seconds = parse_period(zeitraum)
+    if seconds is None:
+        await ctx.send("Fehler: Ungültiger Zeitraum. Beispiele: `24h`, `7d`, `4w` oder `alle`.")
+        return None
+    return seconds, seite
+
+def leaderboard_title(title, zeitraum, page, has_more):
+    period_text = f"letzte {zeitraum}" if zeitraum else "gesamt"
+    more = f", weiter mit Seite {page + 1}" if has_more and page < leaderboard.max_pages else ""
+    return f"**{title} ({period_text}) – Seite {page}{more}**"
+
+@bot.command(name="top")
+@commands.guild_only()
+async def top(ctx, zeitraum: str = None, seite: int = 1):
+    resolved = await resolve_leaderboard_args(ctx, zeitraum, seite)
+    if resolved is None:
+        return
+    if not database.ready:
+        await ctx.send("Fehler: Keine Datenbankverbindung.")
+        return
+    seconds, page = resolved
+    page = leaderboard.clamp_page(page)
+    rows, has_more = await leaderboard.top_posts(ctx.guild.id, seconds, page)
+    if not rows:
+        await ctx.send("Keine Starboard-Beiträge in diesem Zeitraum.")
+        return
+    starboard_channel_id = guild_configs.get(ctx.guild.id).starboard_channel_id
+    lines = [leaderboard_title("Top-Beiträge", zeitraum if seconds else None, page, has_more)]
+    for rank, row in enumerate(rows, start=(page - 1) * leaderboard.page_size + 1):
+        author = f"<@{row['author_id']}>" if row["author_id"] else "unbekannt"
+        link = f"https://discord.com/channels/{ctx.guild.id}/{starboard_channel_id}/{row['starboard_message_id']}"
+        lines.append(f"{rank}. {STAR_EMOJI} {row['stars']} – {author} – {link}")
+    await ctx.send("\n".join(lines), allowed_mentions=discord.AllowedMentions.none())
+
+@bot.command(name="topautoren")
+@commands.guild_only()
+async def top_authors(ctx, zeitraum: str = None, seite: int = 1):
+    resolved = await resolve_leaderboard_args(ctx, zeitraum, seite)
+    if resolved is None:
+        return
+    if not database.ready:
+        await ctx.send("Fehler: Keine Datenbankverbindung.")
+        return
+    seconds, page = resolved
+    page = leaderboard.clamp_page(page)
+    rows, has_more = await leaderboard.top_authors(ctx.guild.id, seconds, page)
+    if not rows:
+        await ctx.send("Keine Starboard-Beiträge in diesem Zeitraum.")
+        return
+    lines = [leaderboard_title("Top-Autoren", zeitraum if seconds else None, page, has_more)]
+    for rank, row in enumerate(rows, start=(page - 1) * leaderboard.page_size + 1):
+        lines.append(f"{rank}. <@{row['author_id']}> – {STAR_EMOJI} {row['stars']} in {row['posts']} Beiträgen")
+    await ctx.send("\n".join(lines), allowed_mentions=discord.AllowedMentions.none())
+
+async def reply_leaderboard_error(ctx, error, command_name):
+    original = getattr(error, "original", error)
+    if isinstance(original, asyncpg.QueryCanceledError):
+        # statement_timeout der Bestenliste überschritten
+        logger.warning(f"Abfrage im {command_name}-Command abgebrochen (Guild {ctx.guild.id}): {original}")
+        await ctx.send("Fehler: Die Abfrage hat zu lange gedauert. Bitte wähle einen kürzeren Zeitraum.")
+    elif isinstance(original, asyncpg.PostgresError):
+        logger.error(f"Datenbankfehler im {command_name}-Command: {original}")
+        await ctx.send("Fehler: Die Bestenliste konnte nicht geladen werden. Bitte versuche es später erneut.")
+    elif isinstance(error, commands.BadArgument):
+        await ctx.send("Fehler: Ungültige Seite. Beispiel: `!top 7d 2`")
+    elif isinstance(error, commands.NoPrivateMessage):
+        await ctx.send("Fehler: Dieser Befehl ist nur auf einem Server verfügbar.")
+    else:
+        logger.error(f"Unbekannter Fehler im {command_name}-Command: {error}")
+        await ctx.send("Ein unbekannter Fehler ist aufgetreten. Bitte versuche es erneut.")
+
+@top.error
+async def top_error(ctx, error):
+    await reply_leaderboard_error(ctx, error, "top")
+
+@top_authors.error
+async def top_authors_error(ctx, error):
+    await reply_leaderboard_error(ctx, error, "topautoren")
+
 # ------------------------
 # Custom Help Command
 # ------------------------
 @bot.command(name="help")
 async def custom_help(ctx):
     help_text = (
-        "**Verfügbare Commands:**\n\n"
+        "**Verfügbare Commands:**\n"
+        "*Alle Einstellungen gelten jeweils für diesen Server.*\n\n"
         "**!setthreshold <Wert>**\n"
         "  - Setzt den Stern-Schwellenwert für das Starboard. *(Admin)*\n\n"
         "**!setforum <#Channel>**\n"
         "  - Setzt den Forum-Channel, aus dem Threads als Ziel dienen. *(Admin)*\n\n"
         "**!setstarboard <#Channel>**\n"
         "  - Setzt den Starboard-Channel, in den Starboard-Posts gepostet werden. *(Admin)*\n\n"
+        "**!resync [neu|status|stop]**\n"
+        "  - Gleicht bestehende Forum-Threads mit dem Starboard ab (fortsetzbar). *(Admin)*\n\n"
+        "**!top [Zeitraum|alle] [Seite]**\n"
+        "  - Zeigt die Beiträge mit den meisten Sternen, optional für einen Zeitraum (z.B. `7d`).\n\n"
+        "**!topautoren [Zeitraum|alle] [Seite]**\n"
+        "  - Zeigt die Autoren mit den meisten Sternen auf dem Starboard.\n\n"
         "**!botstats**\n"
         "  - Zeigt aktuelle Performance- und Monitoring-Daten an. *(Admin)*\n\n"
-        "**!botchart**\n"
-        "  - Zeigt ein Chart der Zeitreihendaten der Starboard-Updates. *(Admin)*\n\n"
-        "**!systemchart**\n"
-        "  - Zeigt ein Diagramm zur CPU- und RAM-Nutzung des Bots. *(Admin)*\n\n"
+        "**!trace [stufen|langsam [n]|json|rate <0-1>|reset]**\n"
+        "  - Zeigt Latenzen pro Stufe eines Starboard-Updates und die langsamsten Traces. *(Admin)*\n\n"
+        "**!botchart [Zeitraum]**\n"
+        "  - Zeigt ein Chart der Zeitreihendaten der Starboard-Updates, optional aus der DB (z.B. `7d`). *(Admin)*\n\n"
+        "**!systemchart [Zeitraum]**\n"
+        "  - Zeigt ein Diagramm zur CPU- und RAM-Nutzung des Bots, optional aus der DB (z.B. `24h`). *(Admin)*\n\n"
         "**!help**\n"
         "  - Zeigt diese Hilfemeldung an.\n"
     )
@@ -375,47 +1353,176 @@ async def custom_help(ctx):
 # ------------------------
 # Botstats Command
 # ------------------------
+def format_shard_stats(stats):
+    parts = []
+    for shard_id, latency in sorted(shard_latencies().items()):
+        parts.append(f"#{shard_id}: {stats['shard_events'].get(shard_id, 0)} Events, "
+                     f"{stats['shard_disconnects'].get(shard_id, 0)} Abbrüche, {latency * 1000:.0f} ms")
+    text = "; ".join(parts) or "keine"
+    if coordinator.enabled:
+        text += (f" | Prozess {PROCESS_INDEX}, Lock-Wartezeit Ø {stats['avg_lock_wait']:.4f} / p99 {stats['p99_lock_wait']:.4f} Sekunden, "
+                 f"{stats['invalidations_received']} Invalidierungen empfangen")
+    return text
+
+def format_pool_stats(stats):
+    pool = database.pool_stats()
+    return (f"{pool['in_use']}/{pool['size']} Verbindungen belegt (max. {pool['max_size']}, {pool['saturation']:.0%}), "
+            f"{pool['waiting']} wartend, Wartezeit Ø {stats['avg_db_acquire_wait']:.4f} / p99 {stats['p99_db_acquire_wait']:.4f} Sekunden, "
+            f"{stats['db_unavailable_events']} Events ohne Verbindung")
+
 @bot.command(name="botstats")
 @commands.has_permissions(administrator=True)
 async def bot_stats(ctx):
     stats = monitor.get_stats()
     stats_text = (
         f"**Bot-Statistiken:**\n"
+        f"Guilds: {len(bot.guilds)} verbunden, {len(guild_configs)} mit Einstellungen\n"
+        f"Shards: {format_shard_stats(stats)}\n"
         f"Reaktionen hinzugefügt: {stats['reaction_add_count']}\n"
         f"Reaktionen entfernt: {stats['reaction_remove_count']}\n"
+        f"Früh verworfene Reaktionen (nicht im Forum): {stats['rejected_early']} (Forum-Threads im Index: {len(forum_threads)})\n"
+        f"Zusammengefasste Reaktions-Events: {stats['coalesced_events']}\n"
+        f"Verfolgte Nachrichten: {len(star_tracker)} (Erstabrufe: {stats['star_seed_fetches']}, Korrekturen: {stats['star_reconcile_corrections']})\n"
         f"Starboard-Updates: {stats['starboard_updates']}\n"
+        f"Übersprungene Edits: {stats['skipped_edits']}, vermiedene Abrufe: {stats['avoided_fetches']}\n"
         f"Durchschnittliche Update-Zeit: {stats['avg_update_time']:.4f} Sekunden\n"
         f"Maximale Update-Zeit: {stats['max_update_time']:.4f} Sekunden\n"
+        f"Update-Zeit p50/p95/p99: {stats['p50_update_time']:.4f} / {stats['p95_update_time']:.4f} / {stats['p99_update_time']:.4f} Sekunden\n"
+        f"Resync: {stats['resync_messages']} Nachrichten gelesen, {stats['resync_actions']} Updates angestoßen\n"
+        f"Warteschlange: {stats['queue_depth']} (max. {stats['max_queue_depth']}, verworfen: {stats['queue_dropped']})\n"
+        f"Wartezeit in Warteschlange: Ø {stats['avg_queue_wait']:.4f} / max. {stats['max_queue_wait']:.4f} Sekunden\n"
+        f"Outbound-Warteschlange: {stats['outbound_queue_depth']} (zusammengefasst: {stats['outbound_coalesced']}, "
+        f"Wartezeit Ø {stats['avg_outbound_wait']:.4f} / p99 {stats['p99_outbound_wait']:.4f} Sekunden)\n"
+        f"Mapping-Cache: {len(mapping_cache)} Einträge, {stats['cache_hits']} Treffer, "
+        f"{stats['cache_misses']} Fehlschläge, {stats['cache_evictions']} Verdrängungen\n"
+        f"Speicher: RSS {stats['rss_mb']:.1f} MB (beim Start {stats['startup_rss_mb'] or 0:.1f} MB), "
+        f"Lean-Modus: {'an' if LEAN_MODE else 'aus'}, Nachrichten-Cache: {len(forum_messages)} Einträge\n"
+        f"Event-Loop-Verzögerung: {stats['loop_lag']:.4f} (max. {stats['max_loop_lag']:.4f}) Sekunden\n"
+        f"Chart-Renderings: {stats['chart_renders']} (Ø {stats['avg_chart_render_time']:.3f} / max. {stats['max_chart_render_time']:.3f} Sekunden, {stats['chart_cache_hits']} aus dem Cache)\n"
         f"Datenbankabfragen: {stats['db_query_count']}\n"
-        f"Gesamte DB-Zeit: {stats['db_total_time']:.4f} Sekunden"
+        f"Gesamte DB-Zeit: {stats['db_total_time']:.4f} Sekunden\n"
+        f"DB-Zeit p50/p95/p99: {stats['p50_db_time']:.4f} / {stats['p95_db_time']:.4f} / {stats['p99_db_time']:.4f} Sekunden\n"
+        f"Gebündelte DB-Schreibvorgänge: {stats['db_write_flushes']} ({stats['db_rows_flushed']} Zeilen, {len(mapping_writer)} ausstehend)\n"
+        f"DB-Pool: {format_pool_stats(stats)}\n"
+        f"Retry-Warteschlange: {len(retry_queue)} vorgemerkt ({retry_queue.in_flight()} in Arbeit), "
+        f"{stats['retries_scheduled']} Fehlschläge, {stats['retry_attempts']} Wiederholungen, "
+        f"{stats['retries_succeeded']} nachgeholt, {stats['retries_given_up']} aufgegeben"
     )
     await ctx.send(stats_text)
 
+# ------------------------
+# Optionaler OpenMetrics-Endpunkt
+# ------------------------
+def shard_latencies():
+    """Gateway-Latenz pro Shard dieses Prozesses: {shard_id: Sekunden}."""
+    if isinstance(bot, commands.AutoShardedBot):
+        return dict(bot.latencies)
+    return {0: bot.latency}
+
+def exporter_gauges():
+    return {
+        "starboard_mapping_cache_entries": len(mapping_cache),
+        "starboard_message_cache_entries": len(forum_messages),
+        "starboard_mapping_writes_pending": len(mapping_writer),
+        "starboard_tracked_messages": len(star_tracker),
+        "starboard_forum_threads_indexed": len(forum_threads),
+        "starboard_guilds_configured": len(guild_configs),
+        "starboard_shard_latency_seconds": shard_latencies(),
+        "starboard_coalescer_pending": update_coalescer.pending_count(),
+        "starboard_outbound_queue_depth": outbound.queue_depth(),
+        **{f"starboard_db_pool_{name}": value for name, value in database.pool_stats().items()},
+    }
+
+metrics_exporter = None
+if METRICS_EXPORTER_CONFIG.get("enabled", False):
+    metrics_exporter = MetricsExporter(
+        monitor,
+        host=METRICS_EXPORTER_CONFIG.get("host", "127.0.0.1"),
+        # Jeder Prozess erhält einen eigenen Port
+        port=METRICS_EXPORTER_CONFIG.get("port", 9108) + PROCESS_INDEX,
+        gauges=exporter_gauges
+    )
+
+# ------------------------
+# Chart-Rendering außerhalb des Event-Loops
+# ------------------------
+chart_renderer = ChartRenderer(
+    cache_seconds=CHARTS_CONFIG.get("cache_seconds", 60),
+    cache_size=CHARTS_CONFIG.get("cache_size", 16)
+)
+
+PERIOD_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def parse_period(value: str):
+    """Wandelt Angaben wie "30m", "12h", "7d" oder "2w" in Sekunden um (None bei ungültiger Eingabe)."""
+    value = value.strip().lower()
+    if len(value) < 2 or value[-1] not in PERIOD_UNITS or not value[:-1].isdigit():
+        return None
+    return int(value[:-1]) * PERIOD_UNITS[value[-1]]
+
+def bot_chart_args():
+    timestamps, (updates,) = monitor.history.snapshot()
+    return timestamps, updates
+
+def system_chart_args():
+    timestamps, (cpu_vals, mem_vals, rss_vals) = monitor.system_usage.snapshot()
+    return timestamps, cpu_vals, mem_vals, rss_vals
+
+async def stored_bot_chart_args(seconds: int):
+    end_ts = time.time()
+    series = await metrics_store.query_series("update_time", end_ts - seconds, end_ts)
+    # Kumulierte Anzahl Updates im Zeitraum (wie beim In-Memory-Chart)
+    updates, total = [], 0
+    for count in series["count"]:
+        total += count
+        updates.append(total)
+    return series["ts"], updates
+
+async def stored_system_chart_args(seconds: int):
+    end_ts = time.time()
+    cpu = await metrics_store.query_series("cpu_percent", end_ts - seconds, end_ts)
+    mem = await metrics_store.query_series("mem_used_mb", end_ts - seconds, end_ts)
+    rss = await metrics_store.query_series("rss_mb", end_ts - seconds, end_ts)
+    # Nur Zeitpunkte verwenden, zu denen beide Werte vorliegen (RSS erst seit dessen Einführung)
+    mem_by_ts = dict(zip(mem["ts"], mem["avg"]))
+    timestamps = [ts for ts in cpu["ts"] if ts in mem_by_ts]
+    cpu_by_ts = dict(zip(cpu["ts"], cpu["avg"]))
+    rss_by_ts = dict(zip(rss["ts"], rss["avg"]))
+    rss_vals = [rss_by_ts.get(ts, float("nan")) for ts in timestamps] if rss_by_ts else None
+    return timestamps, [cpu_by_ts[ts] for ts in timestamps], [mem_by_ts[ts] for ts in timestamps], rss_vals
+
+async def resolve_chart_period(ctx, zeitraum):
+    """Prüft das optionale Zeitraum-Argument der Chart-Commands. Gibt Sekunden, None (In-Memory) oder False zurück."""
+    if zeitraum is None:
+        return None
+    seconds = parse_period(zeitraum)
+    if seconds is None:
+        await ctx.send("Fehler: Ungültiger Zeitraum. Beispiele: `30m`, `12h`, `7d`, `2w`.")
+        return False
+    if metrics_store is None or not database.ready:
+        await ctx.send("Fehler: Die Speicherung der Monitoring-Daten ist nicht aktiviert.")
+        return False
+    # Älter als die Stunden-Rollups gibt es keine Daten (und riesige Werte sprengen den datetime-Bereich)
+    return min(seconds, metrics_store.max_period)
+
 # ------------------------
 # Botchart Command
 # ------------------------
 @bot.command(name="botchart")
 @commands.has_permissions(administrator=True)
-async def bot_chart(ctx):
-    if not monitor.history:
+async def bot_chart(ctx, zeitraum: str = None):
+    seconds = await resolve_chart_period(ctx, zeitraum)
+    if seconds is False:
+        return
+    if seconds is None:
+        png = await chart_renderer.render("botchart", bot_chart_args, render_bot_chart)
+    else:
+        png = await chart_renderer.render(f"botchart:{seconds}", lambda: stored_bot_chart_args(seconds), render_bot_chart)
+    if png is None:
         await ctx.send("Keine historischen Daten vorhanden.")
         return
 
-    timestamps, updates = zip(*monitor.history)
-    start_time = timestamps[0]
-    rel_times = [t - start_time for t in timestamps]
-
-    plt.figure(figsize=(10, 5))
-    plt.plot(rel_times, updates, marker="o", label="Starboard-Updates")
-    plt.xlabel("Zeit (s) seit Start")
-    plt.ylabel("Anzahl Updates")
-    plt.title("Verlauf der Starboard-Updates")
-    plt.grid(True)
-    buf = BytesIO()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
-    plt.close()
-    file = discord.File(fp=buf, filename="botchart.png")
+    file = discord.File(fp=BytesIO(png), filename="botchart.png")
     await ctx.send("Hier ist das aktuelle Starboard-Update-Diagramm:", file=file)
 
 # ------------------------
@@ -423,41 +1530,23 @@ async def bot_chart(ctx):
 # ------------------------
 @bot.command(name="systemchart")
 @commands.has_permissions(administrator=True)
-async def system_chart(ctx):
-    if not monitor.system_usage:
+async def system_chart(ctx, zeitraum: str = None):
+    seconds = await resolve_chart_period(ctx, zeitraum)
+    if seconds is False:
+        return
+    if seconds is None:
+        png = await chart_renderer.render("systemchart", system_chart_args, render_system_chart)
+    else:
+        png = await chart_renderer.render(f"systemchart:{seconds}", lambda: stored_system_chart_args(seconds), render_system_chart)
+    if png is None:
         await ctx.send("Keine System-Daten vorhanden.")
         return
 
-    timestamps, cpu_vals, mem_vals = zip(*monitor.system_usage)
-    start_time = timestamps[0]
-    rel_times = [t - start_time for t in timestamps]
-
-    plt.figure(figsize=(10, 6))
-
-    # CPU
-    plt.subplot(2, 1, 1)
-    plt.plot(rel_times, cpu_vals, marker="o", label="CPU-Auslastung (%)")
-    plt.title("Systemressourcen")
-    plt.ylabel("CPU %")
-    plt.grid(True)
-    plt.legend()
-
-    # RAM
-    plt.subplot(2, 1, 2)
-    plt.plot(rel_times, mem_vals, marker="o", color="orange", label="RAM (MB)")
-    plt.xlabel("Zeit (s) seit Start")
-    plt.ylabel("RAM (MB)")
-    plt.grid(True)
-    plt.legend()
-
-    buf = BytesIO()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
-    plt.close()
-    file = discord.File(fp=buf, filename="systemchart.png")
+    file = discord.File(fp=BytesIO(png), filename="systemchart.png")
     await ctx.send("Hier ist das Diagramm zur CPU- und RAM-Nutzung:", file=file)
 
 # ------------------------
-# Bot starten
+# Bot starten (mehrere Prozesse: launcher.py)
 # ------------------------
-bot.run(TOKEN)
+if __name__ == "__main__":
+    bot.run(TOKEN)
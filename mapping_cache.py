@@ -0,0 +1,55 @@
+import time
+from collections import OrderedDict
+
+from monitoring import monitor
+
+# Rückgabewert von MappingCache.get, wenn der Cache keine Aussage treffen kann.
+# (None ist ein gültiger, negativ gecachter Wert: "nie im Starboard gewesen".)
+MISS = object()
+
+
+class MappingCache:
+    """Größenbegrenzter LRU/TTL-Cache für message_id -> starboard_message_id.
+
+    Einträge mit dem Wert None sind Negativ-Einträge für Nachrichten ohne
+    Starboard-Post und laufen nach `negative_ttl` statt `ttl` Sekunden ab.
+    """
+
+    def __init__(self, max_size=10000, ttl=3600.0, negative_ttl=300.0):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # message_id -> (starboard_message_id, expires_at)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, message_id):
+        entry = self._entries.get(message_id)
+        if entry is None:
+            monitor.record_cache_miss()
+            return MISS
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[message_id]
+            monitor.record_cache_miss()
+            return MISS
+        self._entries.move_to_end(message_id)
+        monitor.record_cache_hit()
+        return value
+
+    def set(self, message_id, starboard_message_id):
+        ttl = self.ttl if starboard_message_id is not None else self.negative_ttl
+        self._entries[message_id] = (starboard_message_id, time.monotonic() + ttl)
+        self._entries.move_to_end(message_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            monitor.record_cache_eviction()
+
+    def invalidate(self, message_id):
+        """Entfernt den Eintrag und gibt den bisherigen Wert zurück (None, wenn keiner vorlag)."""
+        entry = self._entries.pop(message_id, None)
+        return entry[0] if entry is not None else None
+
+    def clear(self):
+        self._entries.clear()
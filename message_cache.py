@@ -0,0 +1,39 @@
+from collections import OrderedDict
+
+
+class RecentMessageCache:
+    """Hält zuletzt abgerufene Forum-Nachrichten (LRU-begrenzt).
+
+    Ersetzt im Lean-Modus den Nachrichten-Cache von discord.py: gespeichert
+    werden nur Nachrichten, die der Bot ohnehin per REST abgerufen hat. Für
+    den Stern-Zähler sind die Reaktionen darin nicht maßgeblich, verwendet
+    werden nur Inhalt und Autor. Bei Edits und Löschungen wird der Eintrag
+    verworfen.
+    """
+
+    def __init__(self, max_size=200):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # message_id -> discord.Message
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, message_id):
+        message = self._entries.get(message_id)
+        if message is not None:
+            self._entries.move_to_end(message_id)
+        return message
+
+    def set(self, message):
+        if self.max_size <= 0:
+            return
+        self._entries[message.id] = message
+        self._entries.move_to_end(message.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def forget(self, message_id):
+        self._entries.pop(message_id, None)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,154 @@
+import logging
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Feste Bucket-Grenzen (Sekunden) für den Export der Latenz-Histogramme
+HISTOGRAM_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# (Metrikname, Attribut in Monitoring, Beschreibung)
+COUNTERS = (
+    ("starboard_reactions_added", "reaction_add_count", "Verarbeitete hinzugefügte Stern-Reaktionen"),
+    ("starboard_reactions_removed", "reaction_remove_count", "Verarbeitete entfernte Stern-Reaktionen"),
+    ("starboard_reactions_rejected_early", "rejected_early", "Anhand der Channel-ID verworfene Reaktionen"),
+    ("starboard_reactions_coalesced", "coalesced_events", "Per Debounce zusammengefasste Reaktions-Events"),
+    ("starboard_star_seed_fetches", "star_seed_fetches", "Nachrichtenabrufe zum Initialisieren von Stern-Zählern"),
+    ("starboard_star_reconcile_corrections", "star_reconcile_corrections", "Beim Abgleich korrigierte Stern-Zähler"),
+    ("starboard_updates", "starboard_updates", "Durchgeführte Starboard-Updates"),
+    ("starboard_skipped_edits", "skipped_edits", "Übersprungene Edits ohne sichtbare Änderung"),
+    ("starboard_avoided_fetches", "avoided_fetches", "Eingesparte fetch_message-Aufrufe"),
+    ("starboard_resync_messages", "resync_messages", "Beim Resync gelesene Nachrichten"),
+    ("starboard_resync_actions", "resync_actions", "Beim Resync angestoßene Starboard-Updates"),
+    ("starboard_queue_dropped", "queue_dropped", "Verworfene Aufträge der Arbeitswarteschlange"),
+    ("starboard_outbound_coalesced", "outbound_coalesced", "Zusammengefasste ausgehende Edits"),
+    ("starboard_mapping_cache_hits", "cache_hits", "Treffer im Mapping-Cache"),
+    ("starboard_mapping_cache_misses", "cache_misses", "Fehlschläge im Mapping-Cache"),
+    ("starboard_mapping_cache_evictions", "cache_evictions", "Verdrängungen aus dem Mapping-Cache"),
+    ("starboard_db_queries", "db_query_count", "Datenbankabfragen"),
+    ("starboard_db_unavailable_events", "db_unavailable_events", "Reaktions-Events ohne Datenbankverbindung"),
+    ("starboard_retries_scheduled", "retries_scheduled", "Fehlgeschlagene Updates, für die ein erneuter Versuch geplant wurde"),
+    ("starboard_retry_attempts", "retry_attempts", "Aus der Retry-Warteschlange erneut eingereichte Updates"),
+    ("starboard_retries_succeeded", "retries_succeeded", "Nach Fehlschlägen nachgeholte Updates"),
+    ("starboard_retries_given_up", "retries_given_up", "Endgültig aufgegebene Updates"),
+    ("starboard_db_write_flushes", "db_write_flushes", "Gebündelte Schreibvorgänge des Write-Behind-Puffers"),
+    ("starboard_db_rows_flushed", "db_rows_flushed", "Vom Write-Behind-Puffer geschriebene Zeilen"),
+    ("starboard_chart_cache_hits", "chart_cache_hits", "Aus dem Cache ausgelieferte Charts"),
+    ("starboard_invalidations_received", "invalidations_received", "Von anderen Prozessen empfangene Cache-Invalidierungen"),
+)
+
+# (Metrikname, Attribut in Monitoring mit {shard_id: Wert}, Beschreibung)
+SHARD_COUNTERS = (
+    ("starboard_shard_events", "shard_events", "Verarbeitete Reaktions-Events pro Shard"),
+    ("starboard_shard_disconnects", "shard_disconnects", "Verbindungsabbrüche zum Gateway pro Shard"),
+)
+
+# (Metrikname, Attribut in Monitoring, Beschreibung)
+HISTOGRAMS = (
+    ("starboard_update_duration_seconds", "update_latency", "Dauer eines Starboard-Updates"),
+    ("starboard_queue_wait_seconds", "queue_wait_latency", "Wartezeit in der Arbeitswarteschlange"),
+    ("starboard_outbound_wait_seconds", "outbound_wait_latency", "Wartezeit ausgehender Discord-Aufrufe im Scheduler"),
+    ("starboard_db_query_duration_seconds", "db_latency", "Dauer einer Datenbankabfrage"),
+    ("starboard_db_acquire_wait_seconds", "db_acquire_latency", "Wartezeit auf eine freie Pool-Verbindung"),
+    ("starboard_chart_render_seconds", "chart_render_latency", "Dauer eines Chart-Renderings"),
+    ("starboard_event_loop_lag_seconds", "loop_lag_latency", "Verzögerung des Event-Loops"),
+    ("starboard_lock_wait_seconds", "lock_wait_latency", "Wartezeit auf Advisory-Locks"),
+)
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render_openmetrics(monitoring, gauges=None):
+    """Erzeugt den OpenMetrics-Text aus dem aktuellen Zustand (nur Skalare und Histogramm-Buckets)."""
+    lines = []
+
+    for name, attr, help_text in COUNTERS:
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"{name}_total {_format_value(getattr(monitoring, attr))}")
+
+    for name, attr, help_text in SHARD_COUNTERS:
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"# HELP {name} {help_text}")
+        for shard_id, value in sorted(getattr(monitoring, attr).items()):
+            lines.append(f'{name}_total{{shard="{shard_id}"}} {_format_value(value)}')
+
+    lines.append("# TYPE starboard_db_query_seconds counter")
+    lines.append("# HELP starboard_db_query_seconds Gesamte Zeit in Datenbankabfragen")
+    lines.append(f"starboard_db_query_seconds_total {_format_value(monitoring.db_total_time)}")
+
+    gauge_values = {
+        "starboard_queue_depth": monitoring.queue_depth,
+        "starboard_queue_depth_max": monitoring.max_queue_depth,
+        "starboard_event_loop_lag_seconds_current": monitoring.loop_lag,
+        "starboard_retry_backlog": monitoring.retry_backlog,
+    }
+    usage = monitoring.system_usage.last()
+    if usage is not None:
+        _, cpu_percent, mem_used_mb, rss_mb = usage
+        gauge_values["starboard_system_cpu_percent"] = cpu_percent
+        gauge_values["starboard_system_memory_used_megabytes"] = mem_used_mb
+        gauge_values["starboard_process_rss_megabytes"] = rss_mb
+    if monitoring.startup_rss_mb is not None:
+        gauge_values["starboard_process_startup_rss_megabytes"] = monitoring.startup_rss_mb
+    if gauges is not None:
+        gauge_values.update(gauges())
+    for name, value in gauge_values.items():
+        lines.append(f"# TYPE {name} gauge")
+        if isinstance(value, dict):
+            # {shard_id: Wert} -> eine Reihe pro Shard
+            for shard_id, shard_value in sorted(value.items()):
+                lines.append(f'{name}{{shard="{shard_id}"}} {_format_value(shard_value)}')
+        else:
+            lines.append(f"{name} {_format_value(value)}")
+
+    for name, attr, help_text in HISTOGRAMS:
+        histogram = getattr(monitoring, attr)
+        lines.append(f"# TYPE {name} histogram")
+        lines.append(f"# HELP {name} {help_text}")
+        for bound, count in zip(HISTOGRAM_BOUNDS, histogram.cumulative_counts(HISTOGRAM_BOUNDS)):
+            lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_count {histogram.count}")
+        lines.append(f"{name}_sum {_format_value(histogram.total)}")
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Kleiner aiohttp-Server, der /metrics im OpenMetrics-Format ausliefert."""
+
+    def __init__(self, monitoring, host="127.0.0.1", port=9108, gauges=None):
+        self.monitoring = monitoring
+        self.host = host
+        self.port = port
+        self.gauges = gauges
+        self._runner = None
+
+    async def handle_metrics(self, request):
+        body = render_openmetrics(self.monitoring, self.gauges)
+        return web.Response(body=body.encode(), headers={"Content-Type": CONTENT_TYPE})
+
+    async def start(self):
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"Metrik-Endpunkt läuft auf http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS metrics_raw (
+        ts TIMESTAMPTZ NOT NULL,
+        metric TEXT NOT NULL,
+        value DOUBLE PRECISION NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS metrics_raw_metric_ts_idx ON metrics_raw (metric, ts);
+    CREATE INDEX IF NOT EXISTS metrics_raw_ts_idx ON metrics_raw (ts);
+
+    CREATE TABLE IF NOT EXISTS metrics_1m (
+        metric TEXT NOT NULL,
+        bucket TIMESTAMPTZ NOT NULL,
+        count BIGINT NOT NULL,
+        sum DOUBLE PRECISION NOT NULL,
+        min DOUBLE PRECISION NOT NULL,
+        max DOUBLE PRECISION NOT NULL,
+        last DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (metric, bucket)
+    );
+    CREATE INDEX IF NOT EXISTS metrics_1m_bucket_idx ON metrics_1m (bucket);
+
+    CREATE TABLE IF NOT EXISTS metrics_1h (
+        metric TEXT NOT NULL,
+        bucket TIMESTAMPTZ NOT NULL,
+        count BIGINT NOT NULL,
+        sum DOUBLE PRECISION NOT NULL,
+        min DOUBLE PRECISION NOT NULL,
+        max DOUBLE PRECISION NOT NULL,
+        last DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (metric, bucket)
+    );
+    CREATE INDEX IF NOT EXISTS metrics_1h_bucket_idx ON metrics_1h (bucket);
+"""
+
+ROLLUP_SQL = """
+    INSERT INTO {table} (metric, bucket, count, sum, min, max, last)
+    SELECT * FROM unnest($1::text[], $2::timestamptz[], $3::bigint[],
+                         $4::float8[], $5::float8[], $6::float8[], $7::float8[])
+    ON CONFLICT (metric, bucket) DO UPDATE
+    SET count = {table}.count + EXCLUDED.count,
+        sum = {table}.sum + EXCLUDED.sum,
+        min = LEAST({table}.min, EXCLUDED.min),
+        max = GREATEST({table}.max, EXCLUDED.max),
+        last = EXCLUDED.last
+"""
+
+# Aggregiert die Rollups in der DB auf höchstens ~max_points Punkte
+QUERY_SQL = """
+    SELECT floor(extract(epoch FROM bucket) / $4) * $4 AS ts,
+           sum(count) AS count,
+           sum(sum) / sum(count) AS avg,
+           max(max) AS max,
+           (array_agg(last ORDER BY bucket DESC))[1] AS last
+    FROM {table}
+    WHERE metric = $1 AND bucket >= $2 AND bucket < $3
+    GROUP BY 1
+    ORDER BY 1
+"""
+
+ROLLUPS = (("metrics_1m", 60), ("metrics_1h", 3600))
+
+
+def _rollup(samples, bucket_seconds):
+    """Fasst (metric, ts, value)-Samples zu Buckets zusammen: count, sum, min, max, last."""
+    buckets = {}
+    for metric, ts, value in samples:
+        key = (metric, ts - ts % bucket_seconds)
+        entry = buckets.get(key)
+        if entry is None:
+            buckets[key] = [1, value, value, value, value, ts]
+        else:
+            entry[0] += 1
+            entry[1] += value
+            entry[2] = min(entry[2], value)
+            entry[3] = max(entry[3], value)
+            if ts >= entry[5]:
+                entry[4] = value
+                entry[5] = ts
+    return buckets
+
+
+class MetricsStore:
+    """Persistiert Monitoring-Samples gebündelt in PostgreSQL.
+
+    Samples werden im Speicher gepuffert und einmal pro `flush_interval`
+    geschrieben: Rohdaten per COPY, dazu die 1-Minuten- und 1-Stunden-Rollups
+    als je ein Upsert. Alte Daten werden gemäß den Retention-Vorgaben gelöscht.
+    """
+
+    def __init__(self, get_pool, flush_interval=60.0, max_buffer=100000,
+                 raw_retention_days=2, minute_retention_days=30, hour_retention_days=365,
+                 prune_interval=3600.0):
+        self.get_pool = get_pool
+        self.flush_interval = flush_interval
+        self.retention = {
+            "metrics_raw": raw_retention_days,
+            "metrics_1m": minute_retention_days,
+            "metrics_1h": hour_retention_days,
+        }
+        self.prune_interval = prune_interval
+        self._buffer = deque(maxlen=max_buffer)
+        self._last_prune = 0.0
+        self._task = None
+
+    @property
+    def max_period(self):
+        """Längster abfragbarer Zeitraum in Sekunden (Aufbewahrung der Stunden-Rollups)."""
+        return self.retention["metrics_1h"] * 86400
+
+    def add(self, metric, timestamp, value):
+        self._buffer.append((metric, timestamp, float(value)))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="metrics-store")
+
+    async def ensure_schema(self):
+        pool = self.get_pool()
+        async with pool.acquire() as connection:
+            await connection.execute(SCHEMA_SQL)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - self._last_prune >= self.prune_interval:
+                    await self.prune()
+            except Exception as e:
+                logger.error(f"Fehler beim Speichern der Monitoring-Daten: {e}")
+
+    async def flush(self):
+        pool = self.get_pool()
+        if pool is None or not self._buffer:
+            return
+        samples = list(self._buffer)
+        self._buffer.clear()
+
+        start = time.perf_counter()
+        try:
+            async with pool.acquire() as connection:
+                async with connection.transaction():
+                    await connection.copy_records_to_table(
+                        "metrics_raw",
+                        records=[(datetime.fromtimestamp(ts, timezone.utc), metric, value)
+                                 for metric, ts, value in samples],
+                        columns=["ts", "metric", "value"]
+                    )
+                    for table, bucket_seconds in ROLLUPS:
+                        buckets = _rollup(samples, bucket_seconds)
+                        await connection.execute(
+                            ROLLUP_SQL.format(table=table),
+                            [metric for metric, _ in buckets],
+                            [datetime.fromtimestamp(bucket, timezone.utc) for _, bucket in buckets],
+                            [entry[0] for entry in buckets.values()],
+                            [entry[1] for entry in buckets.values()],
+                            [entry[2] for entry in buckets.values()],
+                            [entry[3] for entry in buckets.values()],
+                            [entry[4] for entry in buckets.values()]
+                        )
+        except BaseException:
+            # Samples für den nächsten Versuch zurücklegen (älteste zuerst). Wie bei add() gehen bei vollem
+            # Puffer die ältesten verloren: nur so viele der zurückgelegten, wie neben den neuen noch Platz haben
+            free = self._buffer.maxlen - len(self._buffer)
+            if free > 0:
+                self._buffer.extendleft(reversed(samples[-free:]))
+            raise
+        monitor.record_db_query(time.perf_counter() - start)
+
+    async def prune(self):
+        pool = self.get_pool()
+        if pool is None:
+            return
+        start = time.perf_counter()
+        async with pool.acquire() as connection:
+            await connection.execute(
+                "DELETE FROM metrics_raw WHERE ts < now() - make_interval(days => $1)",
+                self.retention["metrics_raw"])
+            for table, _ in ROLLUPS:
+                await connection.execute(
+                    f"DELETE FROM {table} WHERE bucket < now() - make_interval(days => $1)",
+                    self.retention[table])
+        monitor.record_db_query(time.perf_counter() - start)
+        self._last_prune = time.monotonic()
+
+    async def query_series(self, metric, start_ts, end_ts, max_points=500):
+        """Liefert {"ts", "count", "avg", "max", "last"} als Listen – aggregiert in der Datenbank."""
+        pool = self.get_pool()
+        span = max(1.0, end_ts - start_ts)
+        table = "metrics_1m" if span <= 2 * 86400 else "metrics_1h"
+        resolution = 60 if table == "metrics_1m" else 3600
+        step = max(resolution, resolution * int(span / resolution / max_points))
+
+        start = time.perf_counter()
+        async with pool.acquire() as connection:
+            rows = await connection.fetch(
+                QUERY_SQL.format(table=table), metric,
+                datetime.fromtimestamp(start_ts, timezone.utc),
+                datetime.fromtimestamp(end_ts, timezone.utc),
+                float(step)
+            )
+        monitor.record_db_query(time.perf_counter() - start)
+        return {
+            "ts": [float(row["ts"]) for row in rows],
+            "count": [row["count"] for row in rows],
+            "avg": [row["avg"] for row in rows],
+            "max": [row["max"] for row in rows],
+            "last": [row["last"] for row in rows],
+        }
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Fehler beim abschließenden Speichern der Monitoring-Daten: {e}")
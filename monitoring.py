@@ -1,26 +1,284 @@
+import math
 import time
+from array import array
+
 import psutil
 
+
+class TimeSeries:
+    """Zeitreihe fester Kapazität auf Basis von array('d')-Ringpuffern.
+
+    Neue Samples landen im Roh-Ringpuffer. Sobald dieser voll ist, wird das
+    jeweils älteste Sample nicht einfach überschrieben, sondern in einen
+    gröberen Bucket (`bucket_seconds`) eingerechnet; fertige Buckets liegen
+    in einem zweiten Ringpuffer. So bleibt der Speicherbedarf konstant und
+    ältere Daten gehen nur an Auflösung verloren.
+
+    `aggregate` bestimmt, wie Samples eines Buckets zusammengefasst werden:
+    "mean", "max" oder "last" (für kumulative Zähler).
+    """
+
+    def __init__(self, columns=1, capacity=4096, bucket_seconds=60, coarse_capacity=4096, aggregate="mean"):
+        if aggregate not in ("mean", "max", "last"):
+            raise ValueError(f"Unbekannte Aggregation: {aggregate}")
+        self.columns = columns
+        self.capacity = capacity
+        self.bucket_seconds = bucket_seconds
+        self.coarse_capacity = coarse_capacity
+        self.aggregate = aggregate
+
+        # Rohdaten: Spalte 0 = Zeitstempel, danach die Werte
+        self._raw = [array("d", bytes(8 * capacity)) for _ in range(columns + 1)]
+        self._raw_start = 0
+        self._raw_len = 0
+
+        # Heruntergerechnete Buckets
+        self._coarse = [array("d", bytes(8 * coarse_capacity)) for _ in range(columns + 1)]
+        self._coarse_start = 0
+        self._coarse_len = 0
+
+        # Offener Bucket, in den verdrängte Rohdaten eingerechnet werden
+        self._bucket_start = None
+        self._bucket_acc = [0.0] * columns
+        self._bucket_count = 0
+
+    def __len__(self):
+        return self._raw_len + self._coarse_len + (1 if self._bucket_count else 0)
+
+    def append(self, timestamp, *values):
+        if self._raw_len == self.capacity:
+            self._fold_oldest()
+        index = (self._raw_start + self._raw_len) % self.capacity
+        self._raw[0][index] = timestamp
+        for column, value in enumerate(values, start=1):
+            self._raw[column][index] = value
+        self._raw_len += 1
+
+    def _fold_oldest(self):
+        index = self._raw_start
+        timestamp = self._raw[0][index]
+        bucket_start = timestamp - (timestamp % self.bucket_seconds)
+        if self._bucket_start is not None and bucket_start != self._bucket_start:
+            self._close_bucket()
+        self._bucket_start = bucket_start
+        for column in range(self.columns):
+            value = self._raw[column + 1][index]
+            if self.aggregate == "mean":
+                self._bucket_acc[column] += value
+            elif self.aggregate == "max":
+                self._bucket_acc[column] = max(self._bucket_acc[column], value) if self._bucket_count else value
+            else:
+                self._bucket_acc[column] = value
+        self._bucket_count += 1
+        self._raw_start = (self._raw_start + 1) % self.capacity
+        self._raw_len -= 1
+
+    def _bucket_values(self):
+        if self.aggregate == "mean":
+            return [acc / self._bucket_count for acc in self._bucket_acc]
+        return list(self._bucket_acc)
+
+    def _close_bucket(self):
+        if not self._bucket_count:
+            return
+        if self._coarse_len == self.coarse_capacity:
+            self._coarse_start = (self._coarse_start + 1) % self.coarse_capacity
+            self._coarse_len -= 1
+        index = (self._coarse_start + self._coarse_len) % self.coarse_capacity
+        self._coarse[0][index] = self._bucket_start
+        for column, value in enumerate(self._bucket_values(), start=1):
+            self._coarse[column][index] = value
+        self._coarse_len += 1
+        self._bucket_acc = [0.0] * self.columns
+        self._bucket_count = 0
+
+    def last(self):
+        """Neuestes Sample als (timestamp, wert, ...) oder None."""
+        if not self._raw_len:
+            return None
+        index = (self._raw_start + self._raw_len - 1) % self.capacity
+        return tuple(column[index] for column in self._raw)
+
+    def snapshot(self, since=None):
+        """Gibt (timestamps, [werte_spalte_1, ...]) chronologisch zurück, grobe Buckets zuerst."""
+        result = [[] for _ in range(self.columns + 1)]
+
+        def extend(buffers, start, length, capacity):
+            for offset in range(length):
+                index = (start + offset) % capacity
+                if since is not None and buffers[0][index] < since:
+                    continue
+                for column in range(self.columns + 1):
+                    result[column].append(buffers[column][index])
+
+        extend(self._coarse, self._coarse_start, self._coarse_len, self.coarse_capacity)
+        if self._bucket_count and (since is None or self._bucket_start >= since):
+            result[0].append(self._bucket_start)
+            for column, value in enumerate(self._bucket_values(), start=1):
+                result[column].append(value)
+        extend(self._raw, self._raw_start, self._raw_len, self.capacity)
+        return result[0], result[1:]
+
+
+class LatencyHistogram:
+    """Streaming-Histogramm mit logarithmischen Buckets (HDR-ähnlich).
+
+    Werte zwischen `min_value` und `max_value` Sekunden werden mit einer
+    relativen Genauigkeit von `growth - 1` einsortiert. Speicherbedarf und
+    Perzentil-Berechnung sind unabhängig von der Anzahl der Samples.
+    """
+
+    def __init__(self, min_value=1e-6, max_value=600.0, growth=1.05):
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.bucket_count = int(math.ceil(math.log(max_value / min_value) / self._log_growth)) + 2
+        self.counts = array("Q", bytes(8 * self.bucket_count))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _index(self, value):
+        if value <= self.min_value:
+            return 0
+        index = int(math.log(value / self.min_value) / self._log_growth) + 1
+        return min(index, self.bucket_count - 1)
+
+    def upper_bound(self, index):
+        """Obergrenze des Buckets in Sekunden."""
+        return self.min_value * self.growth ** index
+
+    def record(self, value):
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def cumulative_counts(self, bounds):
+        """Kumulierte Anzahl der Samples <= jeder Grenze in `bounds` (aufsteigend sortiert)."""
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            while index < self.bucket_count and self.upper_bound(index) <= bound:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+    def percentile(self, q):
+        """Näherungsweises q-Perzentil (0-100) in Sekunden."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * q / 100.0))
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank:
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+
 class Monitoring:
     def __init__(self):
+        # Abnehmer für Samples (z.B. Persistenz in der Datenbank): sink(metric, timestamp, value)
+        self.sinks = []
+
         # Reaktionen
         self.reaction_add_count = 0
         self.reaction_remove_count = 0
+        # Anhand der Channel-ID verworfene Reaktionen (nicht im Ziel-Forum)
+        self.rejected_early = 0
+        # Per Debounce zusammengefasste Reaktions-Events
+        self.coalesced_events = 0
         
+        # Stern-Zähler aus Gateway-Payloads
+        self.star_seed_fetches = 0
+        self.star_reconcile_corrections = 0
+
         # Starboard-Updates
         self.starboard_updates = 0
-        self.update_durations = []  # in Sekunden
-        # Zeitreihe der Starboard-Updates (für Chart)
-        self.history = []  # Liste aus (timestamp, starboard_updates)
+        self.update_latency = LatencyHistogram()  # in Sekunden
+        # Edits ohne sichtbare Änderung bzw. eingesparte fetch_message-Aufrufe
+        self.skipped_edits = 0
+        self.avoided_fetches = 0
+        # Zeitreihe der Starboard-Updates (für Chart): (timestamp, starboard_updates)
+        self.history = TimeSeries(columns=1, capacity=10000, bucket_seconds=60,
+                                  coarse_capacity=10080, aggregate="last")
+
+        # Resync bestehender Forum-Threads
+        self.resync_messages = 0
+        self.resync_actions = 0
+
+        # Arbeitswarteschlange für Starboard-Updates
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.queue_dropped = 0
+        self.queue_wait_latency = LatencyHistogram()  # in Sekunden
+
+        # Outbound-Scheduler (send/edit/delete im Starboard-Channel)
+        self.outbound_queue_depth = 0
+        self.outbound_coalesced = 0
+        self.outbound_wait_latency = LatencyHistogram()
+
+        # Mapping-Cache (message_id -> starboard_message_id)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
 
         # DB-Nutzung
         self.db_query_count = 0
         self.db_total_time = 0.0
-        # Optional: Liste aus (timestamp, query_duration) für zeitbasierte DB-Charts
-        self.db_history = []
+        # Write-Behind-Flushes der Starboard-Mappings
+        self.db_write_flushes = 0
+        self.db_rows_flushed = 0
+        self.db_latency = LatencyHistogram()
+        # Wartezeit auf eine freie Pool-Verbindung; Events, die vor dem Pool ankamen
+        self.db_acquire_latency = LatencyHistogram()
+        self.db_unavailable_events = 0
+
+        # Retry-Warteschlange für fehlgeschlagene Starboard-Updates
+        self.retries_scheduled = 0   # Fehlschläge, für die ein erneuter Versuch geplant wurde
+        self.retry_attempts = 0      # erneut eingereichte Updates
+        self.retries_succeeded = 0   # nach Fehlschlägen nachgeholte Updates
+        self.retries_given_up = 0
+        self.retry_backlog = 0
+        # Zeitreihe (timestamp, query_duration) für zeitbasierte DB-Charts
+        self.db_history = TimeSeries(columns=1, capacity=10000, bucket_seconds=60,
+                                     coarse_capacity=10080, aggregate="max")
+
+        # Chart-Rendering
+        self.chart_render_latency = LatencyHistogram()
+        self.chart_cache_hits = 0
+
+        # Sharding und prozessübergreifende Abstimmung
+        self.shard_events = {}       # shard_id -> verarbeitete Reaktions-Events
+        self.shard_disconnects = {}  # shard_id -> Verbindungsabbrüche zum Gateway
+        self.lock_wait_latency = LatencyHistogram()
+        self.invalidations_received = 0
 
-        # Systemnutzung
-        self.system_usage = []  # Liste aus (timestamp, cpu_percent, mem_used_mb)
+        # Event-Loop-Verzögerung
+        self.loop_lag = 0.0
+        self.loop_lag_latency = LatencyHistogram()
+
+        # Systemnutzung: (timestamp, cpu_percent, mem_used_mb, rss_mb), alle 30 Sekunden
+        self.system_usage = TimeSeries(columns=3, capacity=2880, bucket_seconds=600,
+                                       coarse_capacity=4320, aggregate="mean")
+        # Resident Set Size des Bot-Prozesses: erste Messung (Start) und letzte (Dauerbetrieb)
+        self.process = psutil.Process()
+        self.startup_rss_mb = None
+        self.rss_mb = 0.0
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def _emit(self, metric, timestamp, value):
+        for sink in self.sinks:
+            sink(metric, timestamp, value)
 
     # --- Reaktionen ---
     def record_reaction_add(self):
@@ -29,44 +287,208 @@ class Monitoring:
     def record_reaction_remove(self):
         self.reaction_remove_count += 1
 
+    def record_rejected_early(self):
+        self.rejected_early += 1
+
+    def record_coalesced_event(self):
+        self.coalesced_events += 1
+
+    # --- Stern-Zähler ---
+    def record_star_seed_fetch(self):
+        self.star_seed_fetches += 1
+
+    def record_star_reconcile_correction(self):
+        self.star_reconcile_corrections += 1
+
     # --- Starboard-Updates ---
     def record_update(self, duration):
         self.starboard_updates += 1
-        self.update_durations.append(duration)
+        self.update_latency.record(duration)
         # Speichere Zeitpunkt und aktuellen Zähler für ein Zeitreihen-Diagramm
-        self.history.append((time.time(), self.starboard_updates))
+        timestamp = time.time()
+        self.history.append(timestamp, self.starboard_updates)
+        self._emit("update_time", timestamp, duration)
+
+    def record_skipped_edit(self):
+        self.skipped_edits += 1
+
+    def record_avoided_fetch(self):
+        self.avoided_fetches += 1
+
+    # --- Resync ---
+    def record_resync_message(self):
+        self.resync_messages += 1
+
+    def record_resync_action(self):
+        self.resync_actions += 1
+
+    # --- Arbeitswarteschlange ---
+    def record_queue_depth(self, depth):
+        self.queue_depth = depth
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def record_queue_wait(self, duration):
+        self.queue_wait_latency.record(duration)
+
+    def record_queue_dropped(self):
+        self.queue_dropped += 1
+
+    # --- Outbound-Scheduler ---
+    def record_outbound_queue_depth(self, depth):
+        self.outbound_queue_depth = depth
+
+    def record_outbound_wait(self, duration):
+        self.outbound_wait_latency.record(duration)
+
+    def record_outbound_coalesced(self):
+        self.outbound_coalesced += 1
+
+    # --- Mapping-Cache ---
+    def record_cache_hit(self):
+        self.cache_hits += 1
+
+    def record_cache_miss(self):
+        self.cache_misses += 1
+
+    def record_cache_eviction(self):
+        self.cache_evictions += 1
 
     # --- Datenbank ---
     def record_db_query(self, duration):
         self.db_query_count += 1
         self.db_total_time += duration
-        # Optional: Zeitreihe der DB-Laufzeiten
-        self.db_history.append((time.time(), duration))
+        self.db_latency.record(duration)
+        # Zeitreihe der DB-Laufzeiten
+        timestamp = time.time()
+        self.db_history.append(timestamp, duration)
+        self._emit("db_query_time", timestamp, duration)
+
+    def record_db_acquire(self, wait):
+        self.db_acquire_latency.record(wait)
+
+    def record_db_unavailable(self):
+        self.db_unavailable_events += 1
+
+    def record_retry_scheduled(self):
+        self.retries_scheduled += 1
+
+    def record_retry_attempt(self):
+        self.retry_attempts += 1
+
+    def record_retry_succeeded(self):
+        self.retries_succeeded += 1
+
+    def record_retry_given_up(self):
+        self.retries_given_up += 1
+
+    def record_retry_backlog(self, size):
+        self.retry_backlog = size
+
+    def record_write_flush(self, rows):
+        self.db_write_flushes += 1
+        self.db_rows_flushed += rows
+
+    # --- Charts ---
+    def record_chart_render(self, duration):
+        self.chart_render_latency.record(duration)
+
+    def record_chart_cache_hit(self):
+        self.chart_cache_hits += 1
+
+    # --- Sharding ---
+    def record_shard_event(self, shard_id):
+        self.shard_events[shard_id] = self.shard_events.get(shard_id, 0) + 1
+
+    def record_shard_disconnect(self, shard_id):
+        self.shard_disconnects[shard_id] = self.shard_disconnects.get(shard_id, 0) + 1
+
+    def record_lock_wait(self, duration):
+        self.lock_wait_latency.record(duration)
+
+    def record_invalidation(self, count=1):
+        self.invalidations_received += count
+
+    # --- Event-Loop ---
+    def record_loop_lag(self, lag):
+        self.loop_lag = lag
+        self.loop_lag_latency.record(lag)
 
     # --- System-Ressourcen ---
     def record_system_usage(self):
-        """Sammelt CPU- und RAM-Daten mithilfe von psutil."""
+        """Sammelt CPU- und RAM-Daten sowie den RSS des Bot-Prozesses mithilfe von psutil."""
         timestamp = time.time()
         cpu_percent = psutil.cpu_percent()
         mem_info = psutil.virtual_memory()
         mem_used_mb = mem_info.used / (1024 * 1024)
-        self.system_usage.append((timestamp, cpu_percent, mem_used_mb))
+        rss_mb = self.process.memory_info().rss / (1024 * 1024)
+        self.rss_mb = rss_mb
+        if self.startup_rss_mb is None:
+            self.startup_rss_mb = rss_mb
+        self.system_usage.append(timestamp, cpu_percent, mem_used_mb, rss_mb)
+        self._emit("cpu_percent", timestamp, cpu_percent)
+        self._emit("mem_used_mb", timestamp, mem_used_mb)
+        self._emit("rss_mb", timestamp, rss_mb)
 
     # --- Stats abrufen ---
     def get_stats(self):
         """Gibt eine Momentaufnahme der wichtigsten Kennzahlen zurück."""
-        avg_update_time = (sum(self.update_durations) / len(self.update_durations)
-                           if self.update_durations else 0.0)
-        max_update_time = max(self.update_durations) if self.update_durations else 0.0
-
         return {
             "reaction_add_count": self.reaction_add_count,
             "reaction_remove_count": self.reaction_remove_count,
+            "rejected_early": self.rejected_early,
+            "coalesced_events": self.coalesced_events,
+            "star_seed_fetches": self.star_seed_fetches,
+            "star_reconcile_corrections": self.star_reconcile_corrections,
             "starboard_updates": self.starboard_updates,
-            "avg_update_time": avg_update_time,
-            "max_update_time": max_update_time,
+            "skipped_edits": self.skipped_edits,
+            "avoided_fetches": self.avoided_fetches,
+            "avg_update_time": self.update_latency.mean(),
+            "max_update_time": self.update_latency.max,
+            "p50_update_time": self.update_latency.percentile(50),
+            "p95_update_time": self.update_latency.percentile(95),
+            "p99_update_time": self.update_latency.percentile(99),
+            "resync_messages": self.resync_messages,
+            "resync_actions": self.resync_actions,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_dropped": self.queue_dropped,
+            "avg_queue_wait": self.queue_wait_latency.mean(),
+            "max_queue_wait": self.queue_wait_latency.max,
+            "outbound_queue_depth": self.outbound_queue_depth,
+            "outbound_coalesced": self.outbound_coalesced,
+            "avg_outbound_wait": self.outbound_wait_latency.mean(),
+            "p99_outbound_wait": self.outbound_wait_latency.percentile(99),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_evictions": self.cache_evictions,
             "db_query_count": self.db_query_count,
-            "db_total_time": self.db_total_time
+            "db_total_time": self.db_total_time,
+            "p50_db_time": self.db_latency.percentile(50),
+            "p95_db_time": self.db_latency.percentile(95),
+            "p99_db_time": self.db_latency.percentile(99),
+            "avg_db_acquire_wait": self.db_acquire_latency.mean(),
+            "p99_db_acquire_wait": self.db_acquire_latency.percentile(99),
+            "db_unavailable_events": self.db_unavailable_events,
+            "retries_scheduled": self.retries_scheduled,
+            "retry_attempts": self.retry_attempts,
+            "retries_succeeded": self.retries_succeeded,
+            "retries_given_up": self.retries_given_up,
+            "retry_backlog": self.retry_backlog,
+            "chart_renders": self.chart_render_latency.count,
+            "avg_chart_render_time": self.chart_render_latency.mean(),
+            "max_chart_render_time": self.chart_render_latency.max,
+            "chart_cache_hits": self.chart_cache_hits,
+            "loop_lag": self.loop_lag,
+            "max_loop_lag": self.loop_lag_latency.max,
+            "db_write_flushes": self.db_write_flushes,
+            "db_rows_flushed": self.db_rows_flushed,
+            "shard_events": dict(self.shard_events),
+            "shard_disconnects": dict(self.shard_disconnects),
+            "avg_lock_wait": self.lock_wait_latency.mean(),
+            "p99_lock_wait": self.lock_wait_latency.percentile(99),
+            "rss_mb": self.rss_mb,
+            "startup_rss_mb": self.startup_rss_mb,
+            "invalidations_received": self.invalidations_received
         }
 
 # Eine globale Instanz, die du in deiner Hauptdatei importierst.
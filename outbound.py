@@ -0,0 +1,179 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+# Niedrigerer Wert = höhere Priorität
+PRIORITY_DELETE = 0
+PRIORITY_SEND = 1
+PRIORITY_EDIT = 2
+
+
+class TokenBucket:
+    """Einfacher Token-Bucket: `rate` Tokens pro Sekunde, höchstens `capacity` angespart."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Sekunden, bis ein Token verfügbar ist (0, wenn sofort)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "route", "action", "future", "enqueued_at", "coalesce_key")
+
+    def __init__(self, priority, seq, route, action, future, coalesce_key):
+        self.priority = priority
+        self.seq = seq
+        self.route = route
+        self.action = action
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+        self.coalesce_key = coalesce_key
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class OutboundScheduler:
+    """Plant ausgehende Discord-Aufrufe (send/edit/delete) unter Beachtung der Rate-Limits.
+
+    Jede Route (der Starboard-Channel) hat einen Token-Bucket, den sich
+    send, edit und delete teilen. Innerhalb einer Route wird der wartende
+    Auftrag mit der höchsten Priorität zuerst ausgeführt (Löschungen vor
+    neuen Posts vor Edits); die Routen untereinander sind unabhängig.
+    Wartende Aufträge mit demselben `coalesce_key` werden zusammengefasst:
+    nur die zuletzt übergebene Aktion wird ausgeführt, alle Aufrufer erhalten
+    deren Ergebnis. Damit das greift, dürfen Aufrufer (z.B. bei Edits) nicht
+    auf das Future warten, bevor sie den nächsten Stand einreichen.
+    """
+
+    def __init__(self, rate=5, per=5.0):
+        self.rate = rate / per
+        self.burst = rate
+        self._buckets = {}    # route -> TokenBucket
+        self._queues = {}     # route -> Heap aus _Job
+        self._coalescable = {}  # coalesce_key -> _Job
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._running = set()
+        self._task = None
+
+    def queue_depth(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def running_count(self):
+        return len(self._running)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="outbound-scheduler")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def drain(self, timeout=None):
+        """Wartet, bis alle eingereihten und laufenden Aufrufe erledigt sind. Gibt False bei Zeitüberschreitung zurück."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue_depth() or self._running:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self.start()
+            await asyncio.sleep(0.05)
+        return True
+
+    def submit(self, route, priority, action, coalesce_key=None):
+        """Reiht `action` (Coroutine-Funktion ohne Argumente) ein und gibt ein Future für das Ergebnis zurück."""
+        self.start()
+        if coalesce_key is not None:
+            job = self._coalescable.get(coalesce_key)
+            if job is not None:
+                # Latest wins: die wartende Aktion wird durch die neue ersetzt
+                job.action = action
+                monitor.record_outbound_coalesced()
+                return job.future
+
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(priority, next(self._seq), route, action, future, coalesce_key)
+        heapq.heappush(self._queues.setdefault(route, []), job)
+        if coalesce_key is not None:
+            self._coalescable[coalesce_key] = job
+        monitor.record_outbound_queue_depth(self.queue_depth())
+        self._wakeup.set()
+        return future
+
+    def _bucket(self, route):
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            bucket = self._buckets[route] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def _next_job(self):
+        """Wählt den besten ausführbaren Auftrag. Gibt (job, None) oder (None, Wartezeit) zurück."""
+        now = time.monotonic()
+        best = None
+        min_wait = None
+        for route, queue in self._queues.items():
+            if not queue:
+                continue
+            wait = self._bucket(route).wait_time(now)
+            if wait > 0:
+                min_wait = wait if min_wait is None else min(min_wait, wait)
+            elif best is None or queue[0] < best:
+                best = queue[0]
+        if best is None:
+            return None, min_wait
+        heapq.heappop(self._queues[best.route])
+        self._bucket(best.route).take(now)
+        if best.coalesce_key is not None:
+            self._coalescable.pop(best.coalesce_key, None)
+        return best, None
+
+    async def _run(self):
+        while True:
+            job, wait = self._next_job()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            monitor.record_outbound_wait(time.perf_counter() - job.enqueued_at)
+            monitor.record_outbound_queue_depth(self.queue_depth())
+            task = asyncio.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job):
+        try:
+            result = await job.action()
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
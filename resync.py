@@ -0,0 +1,141 @@
+import asyncio
+import time
+
+from monitoring import monitor
+
+CHECKPOINT_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS starboard_resync_checkpoint (
+        forum_channel_id BIGINT PRIMARY KEY,
+        last_thread_id BIGINT NOT NULL,
+        threads_done INTEGER NOT NULL DEFAULT 0,
+        messages_done BIGINT NOT NULL DEFAULT 0,
+        actions_done BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+class ResyncCheckpointStore:
+    """Speichert den Fortschritt eines Resyncs pro Forum, damit er fortgesetzt werden kann."""
+
+    def __init__(self, get_pool):
+        self.get_pool = get_pool
+
+    async def ensure_schema(self):
+        async with self.get_pool().acquire() as connection:
+            await connection.execute(CHECKPOINT_SCHEMA_SQL)
+
+    async def load(self, forum_channel_id):
+        async with self.get_pool().acquire() as connection:
+            return await connection.fetchrow(
+                "SELECT last_thread_id, threads_done, messages_done, actions_done "
+                "FROM starboard_resync_checkpoint WHERE forum_channel_id = $1", forum_channel_id)
+
+    async def save(self, forum_channel_id, progress):
+        async with self.get_pool().acquire() as connection:
+            await connection.execute("""
+                INSERT INTO starboard_resync_checkpoint
+                    (forum_channel_id, last_thread_id, threads_done, messages_done, actions_done)
+                VALUES ($1, $2, $3, $4, $5)
+                ON CONFLICT (forum_channel_id) DO UPDATE
+                SET last_thread_id = EXCLUDED.last_thread_id,
+                    threads_done = EXCLUDED.threads_done,
+                    messages_done = EXCLUDED.messages_done,
+                    actions_done = EXCLUDED.actions_done,
+                    updated_at = CURRENT_TIMESTAMP
+            """, forum_channel_id, progress.last_thread_id, progress.threads_done,
+                progress.messages_done, progress.actions_done)
+
+    async def clear(self, forum_channel_id):
+        async with self.get_pool().acquire() as connection:
+            await connection.execute(
+                "DELETE FROM starboard_resync_checkpoint WHERE forum_channel_id = $1", forum_channel_id)
+
+
+class ResyncProgress:
+    def __init__(self, threads_total=0, checkpoint=None):
+        self.threads_total = threads_total
+        self.last_thread_id = checkpoint["last_thread_id"] if checkpoint else 0
+        self.threads_done = checkpoint["threads_done"] if checkpoint else 0
+        self.messages_done = checkpoint["messages_done"] if checkpoint else 0
+        self.actions_done = checkpoint["actions_done"] if checkpoint else 0
+        self.started = time.monotonic()
+        self.messages_this_run = 0
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.messages_this_run / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        return (f"Threads: {self.threads_done}/{self.threads_total}, "
+                f"Nachrichten: {self.messages_done}, Aktionen: {self.actions_done}, "
+                f"Durchsatz: {self.rate():.1f} Nachrichten/s")
+
+
+class ResyncJob:
+    """Gleicht alle Threads eines Forums mit der starboard_mapping-Tabelle ab.
+
+    Threads werden in aufsteigender ID-Reihenfolge abgearbeitet, ihre
+    Nachrichten als Stream gelesen. Pro Batch werden die Mappings mit einer
+    einzigen Abfrage geladen und nur abweichende Nachrichten an `apply`
+    übergeben. Nach jedem Thread wird ein Checkpoint gespeichert.
+    """
+
+    def __init__(self, forum_channel_id, threads, checkpoints, fetch_mappings, apply,
+                 count_stars, get_threshold, backlog, max_in_flight=20, batch_size=100,
+                 on_progress=None, checkpoint=None):
+        self.forum_channel_id = forum_channel_id
+        self.threads = sorted(threads, key=lambda thread: thread.id)
+        self.checkpoints = checkpoints
+        self.fetch_mappings = fetch_mappings  # async (message_ids) -> {message_id: stars}
+        self.apply = apply                    # async (channel_id, message, count)
+        self.count_stars = count_stars
+        self.get_threshold = get_threshold
+        self.backlog = backlog                # () -> Anzahl noch offener Updates
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        self.progress = ResyncProgress(len(self.threads), checkpoint)
+
+    def _needs_action(self, count, mapped_stars):
+        if count >= self.get_threshold():
+            return mapped_stars != count
+        return mapped_stars is not None
+
+    async def _process_batch(self, channel_id, batch):
+        mappings = await self.fetch_mappings([message.id for message, _ in batch])
+        for message, count in batch:
+            if not self._needs_action(count, mappings.get(message.id)):
+                continue
+            # Backpressure: nicht mehr als max_in_flight offene Updates gleichzeitig
+            while self.backlog() >= self.max_in_flight:
+                await asyncio.sleep(0.2)
+            await self.apply(channel_id, message, count)
+            self.progress.actions_done += 1
+            monitor.record_resync_action()
+
+    async def _process_thread(self, thread):
+        batch = []
+        async for message in thread.history(limit=None, oldest_first=True):
+            batch.append((message, self.count_stars(message)))
+            self.progress.messages_done += 1
+            self.progress.messages_this_run += 1
+            monitor.record_resync_message()
+            if len(batch) >= self.batch_size:
+                await self._process_batch(thread.id, batch)
+                batch = []
+        if batch:
+            await self._process_batch(thread.id, batch)
+
+    async def run(self):
+        for thread in self.threads:
+            if thread.id <= self.progress.last_thread_id:
+                continue
+            await self._process_thread(thread)
+            self.progress.last_thread_id = thread.id
+            self.progress.threads_done += 1
+            await self.checkpoints.save(self.forum_channel_id, self.progress)
+            if self.on_progress is not None:
+                await self.on_progress(self.progress)
+        await self.checkpoints.clear(self.forum_channel_id)
+        return self.progress
@@ -0,0 +1,273 @@
+import asyncio
+import heapq
+import logging
+import random
+import time
+
+from monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+RETRY_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS starboard_update_retry (
+        message_id BIGINT PRIMARY KEY,
+        guild_id BIGINT NOT NULL,
+        channel_id BIGINT NOT NULL,
+        attempts INTEGER NOT NULL,
+        next_attempt_at TIMESTAMPTZ NOT NULL,
+        last_error TEXT,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+UPSERT_RETRY_SQL = """
+    INSERT INTO starboard_update_retry(message_id, guild_id, channel_id, attempts, next_attempt_at, last_error)
+    SELECT m, g, c, a, to_timestamp(n), e
+    FROM unnest($1::bigint[], $2::bigint[], $3::bigint[], $4::int[], $5::float8[], $6::text[]) AS t(m, g, c, a, n, e)
+    ON CONFLICT (message_id) DO UPDATE
+    SET guild_id = EXCLUDED.guild_id,
+        channel_id = EXCLUDED.channel_id,
+        attempts = EXCLUDED.attempts,
+        next_attempt_at = EXCLUDED.next_attempt_at,
+        last_error = EXCLUDED.last_error,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+DELETE_RETRY_SQL = "DELETE FROM starboard_update_retry WHERE message_id = ANY($1::bigint[])"
+
+# Im Sharding-Betrieb lädt jeder Prozess nur die Guilds seiner Shards (Discord: (guild_id >> 22) % shard_count)
+LOAD_RETRY_SQL = """
+    SELECT message_id, guild_id, channel_id, attempts, extract(epoch FROM next_attempt_at) AS next_attempt_at, last_error
+    FROM starboard_update_retry
+    WHERE $1::int IS NULL OR ((guild_id >> 22) % $1) = ANY($2::int[])
+"""
+
+
+class RetryEntry:
+    __slots__ = ("guild_id", "channel_id", "attempts", "next_attempt", "error")
+
+    def __init__(self, guild_id, channel_id, attempts, next_attempt, error):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.attempts = attempts
+        self.next_attempt = next_attempt  # Unix-Zeit, da über Neustarts hinweg gespeichert
+        self.error = error
+
+
+class RetryQueue:
+    """Dauerhafte Warteschlange für Starboard-Updates, die an vorübergehenden Fehlern gescheitert sind.
+
+    Pro Nachricht gibt es höchstens einen Eintrag; ein erneuter Fehlschlag
+    erhöht nur dessen Versuchszähler. Der nächste Versuch folgt nach
+    exponentiellem Backoff (`base_delay` · 2^(Versuche−1), höchstens
+    `max_delay`) mit Jitter, nach `max_attempts` Versuchen wird aufgegeben.
+    Gelingt ein Update derselben Nachricht zwischenzeitlich auf anderem
+    Weg, ist der Eintrag erledigt.
+
+    Die Einträge liegen im Speicher und werden alle `poll_interval`
+    Sekunden gebündelt in starboard_update_retry geschrieben; ist die
+    Datenbank nicht erreichbar, bleiben die Änderungen bis zum nächsten
+    Flush vorgemerkt. Der Worker übergibt fällige Einträge mit
+    `resubmit(message_id, guild_id, channel_id)` an die normale
+    Verarbeitung, höchstens `max_concurrency` gleichzeitig. Das Ergebnis
+    meldet die Verarbeitung über record_success/record_failure/give_up;
+    bleibt es länger als `in_flight_timeout` Sekunden aus, gilt der Versuch
+    als fehlgeschlagen.
+    """
+
+    def __init__(self, get_pool, resubmit, is_transient, base_delay=5.0, max_delay=600.0,
+                 max_attempts=12, max_concurrency=4, poll_interval=1.0, in_flight_timeout=300.0):
+        self.get_pool = get_pool
+        self.resubmit = resubmit          # async (message_id, guild_id, channel_id) -> bool (eingereiht)
+        self.is_transient = is_transient  # (Exception) -> bool
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max(1, max_attempts)
+        self.max_concurrency = max(1, max_concurrency)
+        self.poll_interval = poll_interval
+        self.in_flight_timeout = in_flight_timeout
+        self._entries = {}    # message_id -> RetryEntry
+        self._in_flight = {}  # message_id -> Zeitpunkt der Übergabe (monotonic)
+        self._dirty = set()   # noch nicht gespeicherte Änderungen (Upsert oder Löschung)
+        self._flush_lock = asyncio.Lock()
+        self._flush_failing = False
+        self._task = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, message_id):
+        return message_id in self._entries
+
+    def in_flight(self):
+        return len(self._in_flight)
+
+    async def ensure_schema(self):
+        async with self.get_pool().acquire() as connection:
+            await connection.execute(RETRY_SCHEMA_SQL)
+
+    async def load(self, shard_ids=None, shard_count=None):
+        """Übernimmt die gespeicherten Einträge (beim Start, vor dem Worker)."""
+        start = time.perf_counter()
+        async with self.get_pool().acquire() as connection:
+            rows = await connection.fetch(LOAD_RETRY_SQL, shard_count if shard_ids else None, shard_ids or [])
+        monitor.record_db_query(time.perf_counter() - start)
+        for row in rows:
+            self._entries.setdefault(row["message_id"], RetryEntry(
+                row["guild_id"], row["channel_id"], row["attempts"], float(row["next_attempt_at"]), row["last_error"]
+            ))
+        monitor.record_retry_backlog(len(self._entries))
+        return len(rows)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="starboard-retry-queue")
+
+    async def stop(self):
+        """Stoppt den Worker und speichert die restlichen Änderungen."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Fehler beim abschließenden Speichern der Retry-Warteschlange: {e}")
+
+    def backoff(self, attempts):
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        # Jitter: nach einem Ausfall sollen nicht alle Einträge gleichzeitig fällig werden
+        return delay * random.uniform(0.5, 1.0)
+
+    def record_failure(self, message_id, guild_id, channel_id, error):
+        """Ein Update ist an einem vorübergehenden Fehler gescheitert: erneuten Versuch planen."""
+        self._in_flight.pop(message_id, None)
+        entry = self._entries.get(message_id)
+        attempts = (entry.attempts if entry is not None else 0) + 1
+        if attempts > self.max_attempts:
+            self.give_up(message_id, error)
+            return
+        delay = self.backoff(attempts)
+        self._entries[message_id] = RetryEntry(guild_id, channel_id, attempts, time.time() + delay, _describe(error))
+        self._dirty.add(message_id)
+        monitor.record_retry_scheduled()
+        monitor.record_retry_backlog(len(self._entries))
+        logger.warning(f"Starboard-Update für Nachricht {message_id} fehlgeschlagen ({_describe(error)}), "
+                       f"Versuch {attempts}/{self.max_attempts} in {delay:.1f} Sekunden.")
+
+    def record_success(self, message_id):
+        entry = self._entries.pop(message_id, None)
+        self._in_flight.pop(message_id, None)
+        if entry is None:
+            return
+        self._dirty.add(message_id)
+        monitor.record_retry_succeeded()
+        monitor.record_retry_backlog(len(self._entries))
+        logger.info(f"Starboard-Update für Nachricht {message_id} nach {entry.attempts} Fehlversuchen nachgeholt.")
+
+    def give_up(self, message_id, error):
+        """Endgültig fehlgeschlagen (zu viele Versuche oder kein vorübergehender Fehler)."""
+        entry = self._entries.pop(message_id, None)
+        self._in_flight.pop(message_id, None)
+        if entry is None:
+            return
+        self._dirty.add(message_id)
+        monitor.record_retry_given_up()
+        monitor.record_retry_backlog(len(self._entries))
+        logger.error(f"Starboard-Update für Nachricht {message_id} nach {entry.attempts} Versuchen aufgegeben: "
+                     f"{_describe(error)}")
+
+    def discard(self, message_id):
+        """Eintrag ist hinfällig (z.B. Nachricht gelöscht)."""
+        if self._entries.pop(message_id, None) is not None:
+            self._dirty.add(message_id)
+            monitor.record_retry_backlog(len(self._entries))
+        self._in_flight.pop(message_id, None)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.flush()
+                if self._flush_failing:
+                    logger.info("Retry-Warteschlange wird wieder gespeichert.")
+                self._flush_failing = False
+            except Exception as e:
+                # Während eines Ausfalls nur einmal melden
+                if not self._flush_failing:
+                    logger.error(f"Fehler beim Speichern der Retry-Warteschlange: {e}")
+                self._flush_failing = True
+            self._expire_in_flight()
+            await self._resubmit_due()
+
+    def _expire_in_flight(self):
+        deadline = time.monotonic() - self.in_flight_timeout
+        for message_id in [mid for mid, submitted in self._in_flight.items() if submitted < deadline]:
+            entry = self._entries.get(message_id)
+            if entry is None:
+                self._in_flight.pop(message_id, None)
+            else:
+                self.record_failure(message_id, entry.guild_id, entry.channel_id, "kein Ergebnis")
+
+    async def _resubmit_due(self):
+        free = self.max_concurrency - len(self._in_flight)
+        if free <= 0 or not self._entries:
+            return
+        now = time.time()
+        due = heapq.nsmallest(free, (
+            (entry.next_attempt, message_id) for message_id, entry in self._entries.items()
+            if entry.next_attempt <= now and message_id not in self._in_flight
+        ))
+        for _, message_id in due:
+            entry = self._entries.get(message_id)
+            if entry is None:
+                continue
+            self._in_flight[message_id] = time.monotonic()
+            monitor.record_retry_attempt()
+            try:
+                queued = await self.resubmit(message_id, entry.guild_id, entry.channel_id)
+            except Exception as e:
+                if self.is_transient(e):
+                    self.record_failure(message_id, entry.guild_id, entry.channel_id, e)
+                else:
+                    self.give_up(message_id, e)
+                continue
+            if not queued and message_id in self._in_flight:
+                self.record_failure(message_id, entry.guild_id, entry.channel_id, "nicht eingereiht")
+
+    async def flush(self):
+        """Schreibt die vorgemerkten Änderungen. Bei Fehlern bleiben sie vorgemerkt."""
+        async with self._flush_lock:
+            pool = self.get_pool()
+            if pool is None or not self._dirty:
+                return
+            batch, self._dirty = self._dirty, set()
+            upserts = [(mid, self._entries[mid]) for mid in batch if mid in self._entries]
+            deletes = [mid for mid in batch if mid not in self._entries]
+
+            start = time.perf_counter()
+            try:
+                async with pool.acquire() as connection:
+                    async with connection.transaction():
+                        if upserts:
+                            await connection.execute(
+                                UPSERT_RETRY_SQL,
+                                [mid for mid, _ in upserts],
+                                [entry.guild_id for _, entry in upserts],
+                                [entry.channel_id for _, entry in upserts],
+                                [entry.attempts for _, entry in upserts],
+                                [entry.next_attempt for _, entry in upserts],
+                                [entry.error for _, entry in upserts]
+                            )
+                        if deletes:
+                            await connection.execute(DELETE_RETRY_SQL, deletes)
+            except BaseException:
+                self._dirty |= batch
+                raise
+            monitor.record_db_query(time.perf_counter() - start)
+
+
+def _describe(error):
+    if isinstance(error, str):
+        return error
+    return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
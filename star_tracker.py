@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+
+
+class _TrackedMessage:
+    __slots__ = ("guild_id", "channel_id", "count", "reconciled_at")
+
+    def __init__(self, guild_id, channel_id, count):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.count = count
+        self.reconciled_at = time.monotonic()
+
+
+class StarCountTracker:
+    """Hält die Stern-Zähler bekannter Nachrichten im Speicher.
+
+    Ein Eintrag wird einmalig aus einer abgerufenen Nachricht initialisiert
+    (seed) und danach nur noch über die Reaktions-Payloads des Gateways
+    hoch- bzw. heruntergezählt. Die Größe ist per LRU begrenzt; verdrängte
+    Nachrichten werden beim nächsten Event einfach neu initialisiert.
+    """
+
+    def __init__(self, max_size=50000):
+        self.max_size = max(1, max_size)
+        self._entries = OrderedDict()  # message_id -> _TrackedMessage
+
+    def __len__(self):
+        return len(self._entries)
+
+    def is_tracked(self, message_id):
+        return message_id in self._entries
+
+    def get(self, message_id):
+        entry = self._entries.get(message_id)
+        return entry.count if entry is not None else None
+
+    def seed(self, message_id, guild_id, channel_id, count):
+        self._entries[message_id] = _TrackedMessage(guild_id, channel_id, count)
+        self._entries.move_to_end(message_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def apply_delta(self, message_id, delta):
+        """Addiert `delta` auf den Zähler. Gibt None zurück, wenn die Nachricht unbekannt ist."""
+        entry = self._entries.get(message_id)
+        if entry is None:
+            return None
+        entry.count = max(0, entry.count + delta)
+        self._entries.move_to_end(message_id)
+        return entry.count
+
+    def reset(self, message_id):
+        entry = self._entries.get(message_id)
+        if entry is not None:
+            entry.count = 0
+
+    def forget(self, message_id):
+        self._entries.pop(message_id, None)
+
+    def due_for_reconcile(self, max_age, limit):
+        """Liefert bis zu `limit` (message_id, guild_id, channel_id), die länger als `max_age` Sekunden nicht abgeglichen wurden."""
+        threshold = time.monotonic() - max_age
+        due = [(mid, entry.guild_id, entry.channel_id) for mid, entry in self._entries.items()
+               if entry.reconciled_at < threshold]
+        due.sort(key=lambda item: self._entries[item[0]].reconciled_at)
+        return due[:limit]
+
+    def reconcile(self, message_id, count):
+        """Setzt den Zähler auf den tatsächlichen Wert. Gibt True zurück, wenn er abwich."""
+        entry = self._entries.get(message_id)
+        if entry is None:
+            return False
+        entry.reconciled_at = time.monotonic()
+        changed = entry.count != count
+        entry.count = count
+        return changed
@@ -0,0 +1,181 @@
+import functools
+import json
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from monitoring import LatencyHistogram
+
+# Aktueller Span der laufenden Task. Tasks erben ihn beim Erzeugen; ein bereits
+# beendeter Span zählt deshalb nicht als Parent.
+_current = ContextVar("starboard_trace_span", default=None)
+
+
+class _NoopSpan:
+    """Wird zurückgegeben, wenn das Tracing ausgeschaltet ist: kein Zeitstempel, kein Kontextwechsel."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "start", "duration", "error", "children", "sampled", "open",
+                 "_parent", "_token")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.duration = 0.0
+        self.error = None
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is None or not parent.open:
+            # Neuer Trace: wird mit Wahrscheinlichkeit sample_rate aufgezeichnet
+            parent = None
+            rate = self.tracer.sample_rate
+            self.sampled = rate > 0 and random.random() < rate
+        else:
+            self.sampled = parent.sampled
+        self._parent = parent
+        self.children = [] if self.sampled else None
+        self.open = True
+        self._token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        self.open = False
+        _current.reset(self._token)
+        if self.sampled:
+            if exc_type is not None:
+                self.error = exc_type.__name__
+            self.tracer.stage(self.name).record(self.duration)
+            if self._parent is None:
+                self.tracer.finish(self)
+            else:
+                self._parent.children.append(self)
+        return False
+
+    def to_dict(self, origin=None):
+        origin = self.start if origin is None else origin
+        result = {
+            "name": self.name,
+            "offset_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+        }
+        if self.error is not None:
+            result["error"] = self.error
+        if self.children:
+            result["children"] = [child.to_dict(origin) for child in self.children]
+        return result
+
+
+class Tracer:
+    """Leichtgewichtige Spans für den Starboard-Hot-Path.
+
+    Von den Wurzel-Spans (z.B. "update") wird ein Anteil von `sample_rate`
+    samt Kind-Spans aufgezeichnet. Jeder aufgezeichnete Span speist ein
+    Latenz-Histogramm pro Stufe (z.B. "db.get_mapping", "discord.edit");
+    abgeschlossene Traces ab `min_duration` Sekunden landen in einem
+    Ringpuffer, aus dem die langsamsten abgerufen werden können.
+
+    Ist das Tracing aus (`enabled` False oder `sample_rate` 0) oder gehört
+    ein Span zu einem nicht aufgezeichneten Trace, liefert span() ein
+    geteiltes No-Op-Objekt ohne Zeitmessung und Kontextwechsel.
+    """
+
+    def __init__(self, enabled=True, sample_rate=0.05, capacity=100, min_duration=0.0):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.min_duration = min_duration
+        self.stages = {}  # Stufe -> LatencyHistogram
+        self.traces = deque(maxlen=max(1, capacity))
+        self.started_at = time.time()
+
+    def span(self, name):
+        if not self.enabled or self.sample_rate <= 0:
+            return NOOP_SPAN
+        parent = _current.get()
+        if parent is not None and parent.open and not parent.sampled:
+            return NOOP_SPAN
+        return Span(self, name)
+
+    def trace(self, name):
+        """Decorator für Coroutine-Funktionen: der ganze Aufruf wird zu einem Span."""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stage(self, name):
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages[name] = LatencyHistogram()
+        return histogram
+
+    def finish(self, root):
+        if root.duration >= self.min_duration:
+            self.traces.append((time.time(), root))
+
+    def slowest(self, limit=5):
+        """Die langsamsten Traces im Ringpuffer: Liste von (Zeitpunkt, Wurzel-Span)."""
+        return sorted(self.traces, key=lambda entry: entry[1].duration, reverse=True)[:limit]
+
+    def stage_summary(self):
+        """Kennzahlen pro Stufe, nach Gesamtzeit absteigend sortiert."""
+        rows = []
+        for name, histogram in self.stages.items():
+            rows.append({
+                "stage": name,
+                "count": histogram.count,
+                "total": histogram.total,
+                "mean": histogram.mean(),
+                "p50": histogram.percentile(50),
+                "p99": histogram.percentile(99),
+                "max": histogram.max,
+            })
+        rows.sort(key=lambda row: row["total"], reverse=True)
+        return rows
+
+    def reset(self):
+        self.stages = {}
+        self.traces.clear()
+        self.started_at = time.time()
+
+    def export_json(self, limit=None):
+        limit = len(self.traces) if limit is None else limit
+        return json.dumps({
+            "since": self.started_at,
+            "sample_rate": self.sample_rate,
+            "stages": self.stage_summary(),
+            "traces": [dict(timestamp=timestamp, **root.to_dict())
+                       for timestamp, root in self.slowest(limit)],
+        }, indent=2)
+
+
+def _trace_lines(span, indent, origin):
+    error = f" [{span.error}]" if span.error else ""
+    lines = [f"{'  ' * indent}{span.name}: {span.duration * 1000:.1f} ms "
+             f"(+{(span.start - origin) * 1000:.1f} ms){error}"]
+    for child in span.children or ():
+        lines.extend(_trace_lines(child, indent + 1, origin))
+    return lines
+
+
+def format_trace(root):
+    """Textdarstellung eines Traces als eingerückter Baum."""
+    return "\n".join(_trace_lines(root, 0, root.start))
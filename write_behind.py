@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+
+from monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+# Markierung für ein ausstehendes Löschen in MappingWriteBuffer._pending
+DELETE = object()
+# Rückgabewert von pending_value, wenn für die Nachricht nichts aussteht
+NOT_PENDING = object()
+
+UPSERT_BATCH_SQL = """
+    INSERT INTO starboard_mapping(message_id, guild_id, starboard_message_id, stars, author_id)
+    SELECT * FROM unnest($1::bigint[], $2::bigint[], $3::bigint[], $4::int[], $5::bigint[])
+    ON CONFLICT (message_id) DO UPDATE
+    SET guild_id = EXCLUDED.guild_id,
+        author_id = COALESCE(EXCLUDED.author_id, starboard_mapping.author_id),
+        starboard_message_id = EXCLUDED.starboard_message_id,
+        stars = EXCLUDED.stars,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+DELETE_BATCH_SQL = "DELETE FROM starboard_mapping WHERE message_id = ANY($1::bigint[])"
+
+
+class MappingWriteBuffer:
+    """Write-Behind-Puffer für Schreibzugriffe auf starboard_mapping.
+
+    Upserts und Löschungen werden im Speicher gesammelt, pro Nachricht zählt
+    nur der letzte Stand. Geflusht wird alle `flush_interval` Sekunden oder
+    sobald `max_pending` Einträge anstehen – jeweils als ein Upsert- und ein
+    Delete-Statement in einer Transaktion.
+    """
+
+    def __init__(self, get_pool, flush_interval=5.0, max_pending=500, notify=None):
+        self.get_pool = get_pool
+        self.notify = notify  # async (connection, message_ids) innerhalb der Flush-Transaktion
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self._pending = {}   # message_id -> (starboard_message_id, stars, guild_id, author_id) | DELETE
+        self._inflight = {}  # gerade geschriebener Batch
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="mapping-write-behind")
+
+    def upsert(self, message_id, guild_id, starboard_message_id, stars, author_id=None):
+        self._pending[message_id] = (starboard_message_id, stars, guild_id, author_id)
+        self._maybe_request_flush()
+
+    def remove(self, message_id):
+        self._pending[message_id] = DELETE
+        self._maybe_request_flush()
+
+    def pending_value(self, message_id):
+        """Noch nicht geschriebener Stand: starboard_message_id, None (Löschung) oder NOT_PENDING."""
+        entry = self._pending.get(message_id, self._inflight.get(message_id, NOT_PENDING))
+        if entry is NOT_PENDING:
+            return NOT_PENDING
+        if entry is DELETE:
+            return None
+        return entry[0]
+
+    def _maybe_request_flush(self):
+        if len(self._pending) >= self.max_pending:
+            self._flush_requested.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Fehler beim Schreiben der Starboard-Mappings: {e}")
+
+    async def flush(self, connection=None):
+        """Schreibt alle ausstehenden Änderungen. Bei Fehlern bleiben sie im Puffer.
+
+        Mit `connection` wird auf dieser (bereits belegten) Verbindung
+        geschrieben, sonst auf einer Verbindung aus dem Pool.
+        """
+        if connection is not None:
+            await self._flush(connection)
+            return
+        pool = self.get_pool()
+        if pool is None or not self._pending:
+            return
+        # Verbindung vor dem Flush-Lock belegen: wer das Lock hält, wartet nie auf den Pool
+        async with pool.acquire() as connection:
+            await self._flush(connection)
+
+    async def _flush(self, connection):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            self._inflight = batch
+
+            upserts = [(mid, entry) for mid, entry in batch.items() if entry is not DELETE]
+            deletes = [mid for mid, entry in batch.items() if entry is DELETE]
+
+            start = time.perf_counter()
+            try:
+                await self._write(connection, batch, upserts, deletes)
+            except BaseException:
+                # Neuere Änderungen aus der Zwischenzeit haben Vorrang
+                for mid, entry in batch.items():
+                    self._pending.setdefault(mid, entry)
+                raise
+            finally:
+                self._inflight = {}
+
+            monitor.record_db_query(time.perf_counter() - start)
+            monitor.record_write_flush(len(batch))
+            logger.debug(f"{len(upserts)} Upserts und {len(deletes)} Löschungen geschrieben.")
+
+    async def _write(self, connection, batch, upserts, deletes):
+        async with connection.transaction():
+            if upserts:
+                await connection.execute(
+                    UPSERT_BATCH_SQL,
+                    [mid for mid, _ in upserts],
+                    [entry[2] for _, entry in upserts],
+                    [entry[0] for _, entry in upserts],
+                    [entry[1] for _, entry in upserts],
+                    [entry[3] for _, entry in upserts]
+                )
+            if deletes:
+                await connection.execute(DELETE_BATCH_SQL, deletes)
+            if self.notify is not None:
+                await self.notify(connection, list(batch))
+
+    async def close(self):
+        """Stoppt den Flush-Loop und schreibt den restlichen Puffer."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Fehler beim abschließenden Schreiben der Starboard-Mappings: {e}")